@@ -1,7 +1,8 @@
 import os
 import logging
 from flask import Flask
-from models.database import db
+from models.database import db, ensure_schema
+from utils.rollups import check_rollups
 
 # Configure logging for production
 logging.basicConfig(level=logging.INFO)
@@ -66,6 +67,8 @@ def health_check():
 with app.app_context():
     try:
         db.create_all()
+        ensure_schema()
+        check_rollups()
         logging.info("Database tables created successfully")
     except Exception as e:
         logging.error(f"Database initialization error: {str(e)}")
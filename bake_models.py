@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Train all ML models at build time and bake their artifacts into the deployment package
+so serverless workers load models from disk instead of retraining on cold start.
+
+Artifacts are keyed by the scikit-learn and numpy versions they were trained with, so
+they only load in a deployment running the same versions: baking refuses to run unless
+the installed versions match the pins in requirements-vercel.txt.
+
+Usage:
+    python bake_models.py                  # train and save artifacts to model_artifacts/
+    python bake_models.py --package        # ...and build the deployment zip including them
+    python bake_models.py --output-dir DIR # save artifacts somewhere else
+    python bake_models.py --skip-version-check  # bake for the local environment only
+"""
+
+import argparse
+import logging
+import os
+import sys
+from importlib.metadata import version
+
+# Packages whose versions are part of the artifact key (see ModelArtifactStore.config_hash)
+PINNED_PACKAGES = ('scikit-learn', 'numpy')
+
+DEPLOY_REQUIREMENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requirements-vercel.txt')
+
+def version_mismatches(requirements_path=DEPLOY_REQUIREMENTS):
+    """(package, installed, pinned) for each keyed package not installed at its deployment pin"""
+    pins = {}
+    with open(requirements_path) as f:
+        for line in f:
+            name, _, pinned = line.split('#')[0].strip().partition('==')
+            if pinned:
+                pins[name.strip().lower()] = pinned.strip()
+
+    mismatches = []
+    for package in PINNED_PACKAGES:
+        installed = version(package)
+        if installed != pins.get(package):
+            mismatches.append((package, installed, pins.get(package)))
+    return mismatches
+
+def bake_models(output_dir):
+    """Train every model family that has no artifacts yet and save them to output_dir"""
+    # The manager reads the artifact directory at construction time
+    os.environ['MODEL_ARTIFACT_DIR'] = os.path.abspath(output_dir)
+
+    from models.ml_models import MLModelManager, TRAINING_CONFIG
+
+    # Train the families whose artifacts are missing for the current config, in parallel
+    manager = MLModelManager()
+    missing = [model_type for model_type, config in TRAINING_CONFIG.items()
+               if not manager.artifact_store.exists(model_type, config)]
+    if missing:
+        manager.train_all_models(missing)
+    failed = []
+    for model_type, config in TRAINING_CONFIG.items():
+        if manager.artifact_store.exists(model_type, config):
+            print(f"Baked: {model_type} -> {manager.artifact_store.artifact_dir(model_type, config)}")
+        else:
+            failed.append(model_type)
+
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake trained model artifacts for deployment")
+    parser.add_argument('--output-dir', default='model_artifacts',
+                        help="Directory to save artifacts to (default: model_artifacts)")
+    parser.add_argument('--package', action='store_true',
+                        help="Build the deployment zip with the baked artifacts included")
+    parser.add_argument('--skip-version-check', action='store_true',
+                        help="Bake even if scikit-learn/numpy differ from requirements-vercel.txt "
+                             "(the artifacts will not load in the deployment)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    mismatches = version_mismatches()
+    if mismatches and not args.skip_version_check:
+        for package, installed, pinned in mismatches:
+            print(f"{package} {installed} is installed but requirements-vercel.txt pins {pinned}",
+                  file=sys.stderr)
+        print("Artifacts baked with these versions would never load in the deployment; install the "
+              "pinned versions (pip install -r requirements-vercel.txt) or pass --skip-version-check "
+              "to bake for this environment only", file=sys.stderr)
+        return 1
+
+    failed = bake_models(args.output_dir)
+    if failed:
+        print(f"Failed to bake: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+    if args.package:
+        from package_for_deployment import create_deployment_package
+        create_deployment_package(extra_dirs=[args.output_dir])
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
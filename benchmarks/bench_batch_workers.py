@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark sharded batch processing across worker counts.
+
+Runs DataProcessor.process_batch on a synthetic batch of each model type with
+1 (in-process) to N worker processes and reports rows/sec and speedup. Worker
+pools are started and their models loaded before timing.
+
+Usage:
+    python benchmarks/bench_batch_workers.py [--rows 200000] [--product-rows 20000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_batch(model_type, n_rows):
+    """Synthetic batch input for a model type, with the columns a CSV upload would have"""
+    from models.ml_models import generate_packaging_data, generate_carbon_data, generate_esg_data, ESG_FEATURES
+
+    if model_type == 'packaging':
+        df = generate_packaging_data(n_rows, random_state=7).drop(columns=['packaging_type'])
+    elif model_type == 'carbon_footprint':
+        df = generate_carbon_data(n_rows, random_state=7).drop(columns=['carbon_footprint'])
+    elif model_type == 'esg_score':
+        df = generate_esg_data(n_rows, random_state=7)[ESG_FEATURES]
+    else:
+        rng = np.random.default_rng(7)
+        df = pd.DataFrame({
+            'category': rng.choice(['electronics', 'clothing', 'food', 'home', 'beauty'], n_rows),
+            'budget': rng.uniform(10, 1000, n_rows).round(2),
+            'eco_priority': rng.choice([True, False], n_rows)
+        })
+
+    # Categorical columns arrive as plain strings from read_csv
+    return df.astype({column: str for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded batch processing benchmark")
+    parser.add_argument('--rows', type=int, default=200000, help="Rows per batch")
+    parser.add_argument('--product-rows', type=int, default=20000, help="Rows per product recommendation batch")
+    parser.add_argument('--workers', type=int, nargs='+', default=None, help="Worker counts to compare")
+    args = parser.parse_args()
+    worker_counts = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.ERROR)
+
+    from utils.data_processor import DataProcessor
+
+    print(f"{'model':<24}{'workers':>8}{'rows':>9}{'rows/sec':>12}{'speedup':>9}")
+    for model_type in ('packaging', 'carbon_footprint', 'product_recommendation', 'esg_score'):
+        n_rows = args.product_rows if model_type == 'product_recommendation' else args.rows
+        df = make_batch(model_type, n_rows)
+        baseline = None
+
+        for workers in worker_counts:
+            processor = DataProcessor()
+            processor.batch_workers = workers
+            processor.parallel_min_rows = 0
+            # Train or load the models in this process, so workers find saved artifacts
+            processor.ml_manager.ensure_model(model_type)
+            if workers > 1:
+                processor.process_batch(df.iloc[:workers], model_type)
+
+            start = time.perf_counter()
+            results = processor.process_batch(df, model_type)
+            elapsed = time.perf_counter() - start
+            if len(results) != n_rows:
+                print(f"{model_type} with {workers} workers returned {len(results)} of {n_rows} rows")
+                return 1
+
+            rate = n_rows / elapsed
+            baseline = baseline or rate
+            print(f"{model_type:<24}{workers:>8}{n_rows:>9}{rate:>12,.0f}{rate / baseline:>8.1f}x")
+            processor._reset_pool()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
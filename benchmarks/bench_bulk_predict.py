@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bulk prediction path against one single-item prediction per input.
+
+Builds random JSON inputs for each model, some of which leave out optional fields
+other inputs in the same list carry, and checks that DataProcessor.process_items
+(the path of /api/predict/<model>/batch) gives each item the prediction the
+single-item call gives it. Then reports the time of both over the whole list, with
+the prediction cache off so every run predicts.
+
+Usage:
+    python benchmarks/bench_bulk_predict.py [--items 1000] [--repeats 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ml_models import ESG_DEFAULTS
+from utils.data_processor import DataProcessor, REQUIRED_COLUMNS
+
+def random_items(model_type, n_items, rng):
+    """n_items inputs; optional fields are each present in about half of them"""
+    items = []
+    for _ in range(n_items):
+        if model_type == 'packaging':
+            item = {
+                'product_weight': round(rng.uniform(0.1, 50), 2),
+                'fragility': rng.choice(['low', 'medium', 'high']),
+                'material_type': rng.choice(['plastic', 'glass', 'metal', 'organic']),
+                'transport_mode': rng.choice(['ground', 'air', 'sea'])
+            }
+        elif model_type == 'carbon_footprint':
+            item = {
+                'age': rng.randint(18, 80),
+                'income': rng.randint(20000, 200000),
+                'location': rng.choice(['urban', 'suburban', 'rural']),
+                'transport_preference': rng.choice(['car', 'public_transport', 'bike', 'walk'])
+            }
+        elif model_type == 'product_recommendation':
+            item = {
+                'category': rng.choice(['electronics', 'clothing', 'food', 'home', 'beauty']),
+                'budget': rng.randint(10, 2000)
+            }
+            if rng.random() < 0.5:
+                item['eco_priority'] = rng.random() < 0.5
+        else:
+            item = {field: round(rng.uniform(0, 2 * ESG_DEFAULTS[field]), 2) for field in REQUIRED_COLUMNS[model_type]}
+            for field in ESG_DEFAULTS:
+                if field not in item and rng.random() < 0.5:
+                    item[field] = round(rng.uniform(0, 2 * ESG_DEFAULTS[field]), 2)
+        items.append(item)
+    return items
+
+def single_predictions(manager, model_type, items):
+    """The single-item prediction of each input, as the batch results hold it"""
+    if model_type == 'packaging':
+        return [manager.predict_packaging(item) for item in items]
+    if model_type == 'carbon_footprint':
+        return [manager.predict_carbon_footprint(item) for item in items]
+    if model_type == 'product_recommendation':
+        return [manager.predict_product_recommendations(item) for item in items]
+    return [manager.predict_esg_score(item) for item in items]
+
+def bulk_predictions(processor, model_type, items):
+    """The prediction field of each process_items result"""
+    field = {'product_recommendation': 'recommendations', 'esg_score': 'esg_scores'}.get(model_type, 'prediction')
+    return [result.get(field, result.get('error')) for result in processor.process_items(items, model_type)]
+
+def time_runs(fn, repeats):
+    """Per-run times in milliseconds"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk prediction benchmark")
+    parser.add_argument('--items', type=int, default=1000, help="Inputs per request")
+    parser.add_argument('--repeats', type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    os.environ['MODEL_CACHE_SIZE'] = '0'
+    processor = DataProcessor()
+    manager = processor.ml_manager
+    manager.warmup(list(REQUIRED_COLUMNS))
+    rng = random.Random(42)
+
+    print(f"{'model':<24}{'items':>7}{'single p50':>13}{'bulk p50':>11}{'speedup':>9}")
+    for model_type in REQUIRED_COLUMNS:
+        items = random_items(model_type, args.items, rng)
+
+        expected = single_predictions(manager, model_type, items)
+        actual = bulk_predictions(processor, model_type, items)
+        mismatches = [index for index, (one, other) in enumerate(zip(expected, actual)) if one != other]
+        if mismatches:
+            index = mismatches[0]
+            print(f"{model_type}: {len(mismatches)} bulk predictions differ from single ones, "
+                  f"first at item {index} {items[index]}: {actual[index]} != {expected[index]}")
+            return 1
+
+        single = time_runs(lambda: single_predictions(manager, model_type, items), args.repeats)
+        bulk = time_runs(lambda: processor.process_items(items, model_type), args.repeats)
+        print(f"{model_type:<24}{len(items):>7}"
+              f"{np.percentile(single, 50):>11.1f}ms{np.percentile(bulk, 50):>9.1f}ms"
+              f"{np.percentile(single, 50) / np.percentile(bulk, 50):>8.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
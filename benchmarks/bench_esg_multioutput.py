@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compare the four single-output ESG forests with the multi-output forest of MODEL_ESG_MULTIOUTPUT.
+
+Trains both setups on the same synthetic ESG data, then reports held-out accuracy
+(R^2 and MAE per score), single-row prediction latency and model size. The
+multi-output forest is also trained on standardized targets, so that no score
+dominates the shared split criterion.
+
+Usage:
+    python benchmarks/bench_esg_multioutput.py [--n-samples 300] [--test-samples 2000]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ml_models import ESG_FEATURES, ESG_SCORE_TYPES, TRAINING_CONFIG, generate_esg_data
+
+def median_latency_ms(fn, repeats=200):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies))
+
+def main():
+    config = TRAINING_CONFIG['esg_score']
+    parser = argparse.ArgumentParser(description="Multi-output vs per-score ESG forests")
+    parser.add_argument('--n-samples', type=int, default=config['n_samples'], help="Training rows")
+    parser.add_argument('--test-samples', type=int, default=2000, help="Held-out rows")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    # Held-out data comes from a different seed than the training data
+    train = generate_esg_data(args.n_samples, config['random_state'])
+    test = generate_esg_data(args.test_samples, config['random_state'] + 1)
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(train[ESG_FEATURES])
+    X_test = scaler.transform(test[ESG_FEATURES])
+
+    separate = {}
+    for score_type in ESG_SCORE_TYPES:
+        separate[score_type] = RandomForestRegressor(n_estimators=config['n_estimators'], random_state=config['random_state'])
+        separate[score_type].fit(X_train, train[score_type])
+
+    combined = RandomForestRegressor(n_estimators=config['n_estimators'], random_state=config['random_state'])
+    combined.fit(X_train, train[ESG_SCORE_TYPES].to_numpy())
+
+    target_scaler = StandardScaler()
+    standardized = RandomForestRegressor(n_estimators=config['n_estimators'], random_state=config['random_state'])
+    standardized.fit(X_train, target_scaler.fit_transform(train[ESG_SCORE_TYPES].to_numpy()))
+
+    combined_predictions = combined.predict(X_test)
+    standardized_predictions = target_scaler.inverse_transform(standardized.predict(X_test))
+    print(f"{'score':<14}{'4 models R2':>13}{'MAE':>8}{'multi-output R2':>17}{'MAE':>8}"
+          f"{'standardized R2':>17}{'MAE':>8}")
+    for i, score_type in enumerate(ESG_SCORE_TYPES):
+        expected = test[score_type]
+        single = separate[score_type].predict(X_test)
+        print(f"{score_type:<14}{r2_score(expected, single):>13.4f}{mean_absolute_error(expected, single):>8.4f}"
+              f"{r2_score(expected, combined_predictions[:, i]):>17.4f}"
+              f"{mean_absolute_error(expected, combined_predictions[:, i]):>8.4f}"
+              f"{r2_score(expected, standardized_predictions[:, i]):>17.4f}"
+              f"{mean_absolute_error(expected, standardized_predictions[:, i]):>8.4f}")
+
+    row = X_test[:1]
+    separate_ms = median_latency_ms(lambda: [model.predict(row) for model in separate.values()])
+    combined_ms = median_latency_ms(lambda: combined.predict(row))
+    separate_nodes = sum(tree.tree_.node_count for model in separate.values() for tree in model.estimators_)
+    combined_nodes = sum(tree.tree_.node_count for tree in combined.estimators_)
+    separate_bytes = len(pickle.dumps(separate))
+    combined_bytes = len(pickle.dumps(combined))
+
+    print()
+    print(f"{'':<22}{'4 models':>12}{'multi-output':>14}{'ratio':>8}")
+    print(f"{'1-row latency (ms)':<22}{separate_ms:>12.3f}{combined_ms:>14.3f}{separate_ms / combined_ms:>7.1f}x")
+    print(f"{'tree nodes':<22}{separate_nodes:>12}{combined_nodes:>14}{separate_nodes / combined_nodes:>7.1f}x")
+    print(f"{'pickled size (KB)':<22}{separate_bytes / 1024:>12.0f}{combined_bytes / 1024:>14.0f}{separate_bytes / combined_bytes:>7.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark the dashboard and batch-result queries with and without the model indexes.
+
+Seeds a database with synthetic predictions, batch jobs, batch results and user
+sessions, drops the indexes defined on the models, then prints the query plan and
+latency (p50/p99) of each hot query. The indexes are then created with
+ensure_indexes(), as `python -m models.database --ensure-indexes` adds them to an
+existing deployment, and the queries are measured again. Plans come from EXPLAIN
+QUERY PLAN on SQLite and EXPLAIN ANALYZE on PostgreSQL.
+
+The database is dropped and recreated, so point --database-url at a scratch database.
+
+Usage:
+    python benchmarks/bench_indexes.py [--database-url sqlite:////tmp/bench_indexes.db]
+        [--predictions 1000000] [--batches 2000] [--repeats 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import desc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db, ensure_indexes, Prediction, BatchProcessing, BatchResult, UserSession
+
+MODEL_TYPES = ['packaging', 'carbon_footprint', 'product_recommendation', 'esg_score']
+
+# Rows per executemany while seeding
+SEED_CHUNK = 20000
+
+def create_app(database_url):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def insert_chunks(table, rows):
+    """executemany INSERT of a row generator, SEED_CHUNK rows at a time"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == SEED_CHUNK:
+            db.session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+    db.session.commit()
+
+def seed(n_predictions, n_batches, rows_per_batch, n_sessions, days):
+    """Fill the tables with rows spread over the last `days` days"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    span = days * 86400
+
+    insert_chunks(Prediction.__table__, (
+        {
+            'model_type': rng.choice(MODEL_TYPES),
+            'input_data': {'value': i},
+            'prediction_result': {'value': rng.random()},
+            'confidence_score': rng.random(),
+            'processing_time': rng.random() / 10,
+            'created_at': now - timedelta(seconds=rng.random() * span),
+            'ip_address': '127.0.0.1'
+        }
+        for i in range(n_predictions)
+    ))
+    insert_chunks(BatchProcessing.__table__, (
+        {
+            'filename': f'batch_{i}.csv',
+            'model_type': rng.choice(MODEL_TYPES),
+            'total_rows': rows_per_batch,
+            'processed_rows': rows_per_batch,
+            'successful_rows': rows_per_batch,
+            'failed_rows': 0,
+            'processing_time': rng.random() * 10,
+            'status': 'completed',
+            'created_at': now - timedelta(seconds=rng.random() * span)
+        }
+        for i in range(n_batches)
+    ))
+    # About 1% of rows fail
+    insert_chunks(BatchResult.__table__, (
+        {
+            'batch_id': batch_id,
+            'row_index': row_index,
+            'successful': rng.random() >= 0.01,
+            'result': {'row_index': row_index}
+        }
+        for batch_id in range(1, n_batches + 1)
+        for row_index in range(rows_per_batch)
+    ))
+    insert_chunks(UserSession.__table__, (
+        {
+            'session_id': f'session-{i}',
+            'user_agent': 'bench',
+            'ip_address': '127.0.0.1',
+            'predictions_count': rng.randint(0, 50),
+            'created_at': now - timedelta(seconds=rng.random() * span),
+            'last_activity': now - timedelta(seconds=rng.random() * span)
+        }
+        for i in range(n_sessions)
+    ))
+
+def hot_queries(n_batches):
+    """The queries the indexes serve, as the routes build them"""
+    now = datetime.utcnow()
+    return {
+        'recent predictions': Prediction.query.order_by(desc(Prediction.created_at)).limit(20),
+        'recent predictions by model': Prediction.query.filter(Prediction.model_type == 'esg_score')
+            .order_by(desc(Prediction.created_at)).limit(20),
+        'export last day by model': Prediction.query.filter(Prediction.created_at >= now - timedelta(days=1))
+            .filter(Prediction.model_type == 'esg_score').order_by(desc(Prediction.created_at)),
+        'recent batches': BatchProcessing.query.order_by(desc(BatchProcessing.created_at)).limit(5),
+        'active sessions': UserSession.query.filter(UserSession.last_activity >= now - timedelta(hours=1))
+            .with_entities(db.func.count(UserSession.id)),
+        'failed batch results': BatchResult.query.filter(BatchResult.batch_id == n_batches // 2)
+            .filter(BatchResult.successful.is_(False)).order_by(BatchResult.row_index).limit(100)
+    }
+
+def explain(query):
+    """Query plan text of a query"""
+    statement = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN ANALYZE' if db.engine.dialect.name == 'postgresql' else 'EXPLAIN QUERY PLAN'
+    rows = db.session.execute(db.text(f'{prefix} {statement}')).fetchall()
+    return '\n'.join('    ' + str(row[-1]) for row in rows)
+
+def time_query(query, repeats):
+    """Per-execution latencies in milliseconds"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        query.all()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+def measure(label, n_batches, repeats):
+    print(f"\n=== {label} ===")
+    results = {}
+    for name, query in hot_queries(n_batches).items():
+        latencies = time_query(query, repeats)
+        results[name] = latencies
+        print(f"\n{name}: p50 {np.percentile(latencies, 50):.3f} ms, p99 {np.percentile(latencies, 99):.3f} ms")
+        print(explain(query))
+    return results
+
+def drop_model_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind=db.engine, checkfirst=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Database index benchmark")
+    parser.add_argument('--database-url', default='sqlite:////tmp/bench_indexes.db', help="Scratch database URL")
+    parser.add_argument('--predictions', type=int, default=1000000, help="Prediction rows to seed")
+    parser.add_argument('--batches', type=int, default=2000, help="Batch jobs to seed")
+    parser.add_argument('--rows-per-batch', type=int, default=100, help="Result rows per batch job")
+    parser.add_argument('--sessions', type=int, default=100000, help="User sessions to seed")
+    parser.add_argument('--days', type=int, default=90, help="Days the seeded rows are spread over")
+    parser.add_argument('--repeats', type=int, default=50, help="Executions per measurement")
+    args = parser.parse_args()
+
+    app = create_app(args.database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        start = time.perf_counter()
+        seed(args.predictions, args.batches, args.rows_per_batch, args.sessions, args.days)
+        print(f"Seeded {args.predictions} predictions, {args.batches} batches "
+              f"({args.batches * args.rows_per_batch} results) and {args.sessions} sessions "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        drop_model_indexes()
+        before = measure("Without indexes", args.batches, args.repeats)
+
+        start = time.perf_counter()
+        created = ensure_indexes()
+        print(f"\nCreated {len(created)} indexes in {time.perf_counter() - start:.1f}s: {', '.join(created)}")
+        after = measure("With indexes", args.batches, args.repeats)
+
+        print(f"\n{'query':<30} {'p50 before':>12} {'p50 after':>12} {'speedup':>9}")
+        for name in before:
+            p50_before = np.percentile(before[name], 50)
+            p50_after = np.percentile(after[name], 50)
+            print(f"{name:<30} {p50_before:>10.3f}ms {p50_after:>10.3f}ms {p50_before / p50_after:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the product recommendation index against filtering the catalog DataFrame.
+
+Builds synthetic catalogs of a few sizes, checks that the index returns the same
+recommendations as the pandas filter / nlargest query it replaced, then reports
+per-query latency (p50/p99) of both over random categories, budgets and eco flags.
+
+Usage:
+    python benchmarks/bench_recommendations.py [--sizes 10000 100000 1000000] [--queries 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ml_models import generate_product_data
+from models.recommendation_index import RecommendationIndex
+
+CATEGORIES = ['electronics', 'clothing', 'food', 'home', 'beauty']
+
+def pandas_recommend(products, category, budget, eco_priority):
+    """The DataFrame query the index replaced"""
+    filtered = products[(products['category'] == category) & (products['price'] <= budget)]
+    if eco_priority:
+        filtered = filtered[filtered['eco_friendly'] == 1]
+    return [
+        {
+            'product_id': int(product['product_id']),
+            'category': product['category'],
+            'sustainability_score': round(product['sustainability_score'], 2),
+            'price': round(product['price'], 2),
+            'rating': round(product['rating'], 2),
+            'eco_friendly': bool(product['eco_friendly']),
+            'recommendation_score': round(product['recommendation_score'], 2)
+        }
+        for _, product in filtered.nlargest(5, 'recommendation_score').iterrows()
+    ]
+
+def time_queries(fn, queries):
+    """Per-query latencies in milliseconds"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(*query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Product recommendation index benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help="Catalog sizes")
+    parser.add_argument('--queries', type=int, default=200, help="Queries per measurement")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    rng = np.random.default_rng(3)
+
+    print(f"{'products':>10}{'build':>9}{'pandas p50':>13}{'p99':>9}{'index p50':>12}{'p99':>9}{'speedup':>9}")
+    for n_products in args.sizes:
+        products = generate_product_data(n_products, random_state=42)
+        start = time.perf_counter()
+        index = RecommendationIndex.from_products(products)
+        build_time = time.perf_counter() - start
+
+        queries = [
+            (str(rng.choice(CATEGORIES)), float(rng.uniform(10, 1000)), bool(rng.integers(0, 2)))
+            for _ in range(args.queries)
+        ]
+        for query in queries[:20]:
+            if index.recommend(*query) != pandas_recommend(products, *query):
+                print(f"{n_products} products: index recommendations differ for {query}")
+                return 1
+
+        baseline = time_queries(lambda *query: pandas_recommend(products, *query), queries)
+        indexed = time_queries(index.recommend, queries)
+        print(f"{n_products:>10}{build_time:>8.2f}s"
+              f"{np.percentile(baseline, 50):>11.3f}ms{np.percentile(baseline, 99):>7.3f}ms"
+              f"{np.percentile(indexed, 50):>10.3f}ms{np.percentile(indexed, 99):>7.3f}ms"
+              f"{np.percentile(baseline, 50) / np.percentile(indexed, 50):>8.0f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark parallel model training across CPU budgets.
+
+Trains every model family with MLModelManager.train_all_models for each CPU
+budget and reports wall time and speedup over a single CPU. Artifacts are saved
+to a temporary directory.
+
+Usage:
+    python benchmarks/bench_training.py [--n-samples 100000] [--cpus 1 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel training benchmark")
+    parser.add_argument('--n-samples', type=int, default=100000, help="Training rows per model family")
+    parser.add_argument('--cpus', type=int, nargs='+', default=None, help="CPU budgets to compare")
+    args = parser.parse_args()
+    cpu_budgets = args.cpus or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    warnings.filterwarnings('ignore')
+    # Read when models.ml_models is imported, here and in the worker processes
+    os.environ['MODEL_ARTIFACT_DIR'] = tempfile.mkdtemp(prefix='bench_training_')
+    for model_type in ('packaging', 'carbon_footprint', 'product_recommendation', 'esg_score'):
+        os.environ[f"MODEL_N_SAMPLES_{model_type.upper()}"] = str(args.n_samples)
+
+    from models.ml_models import MLModelManager, training_plan, TRAINING_CONFIG
+
+    manager = MLModelManager()
+    print(f"{'cpus':>5}{'workers':>9}{'n_jobs':>8}{'wall time':>12}{'speedup':>9}")
+    baseline = None
+    for cpu_budget in cpu_budgets:
+        manager.training_cpus = cpu_budget
+        workers, n_jobs = training_plan(len(TRAINING_CONFIG), cpu_budget)
+
+        start = time.perf_counter()
+        results = manager.train_all_models()
+        elapsed = time.perf_counter() - start
+        if any(result['status'] != 'ready' for result in results.values()):
+            print(f"Training failed: {results}")
+            return 1
+
+        baseline = baseline or elapsed
+        print(f"{cpu_budget:>5}{workers:>9}{n_jobs:>8}{elapsed:>11.2f}s{baseline / elapsed:>8.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
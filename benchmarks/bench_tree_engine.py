@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled tree engine against sklearn's RandomForest predict.
+
+Checks that both give identical predictions, then reports per-call latency
+(p50/p99) for single rows and for a few batch sizes.
+
+Usage:
+    python benchmarks/bench_tree_engine.py [--repeats 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ml_models import ESG_SCORE_TYPES, MLModelManager, SeparateForests
+from models.tree_engine import CompiledForest
+
+def time_calls(fn, repeats):
+    """Per-call latencies in milliseconds"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+def forests(manager):
+    """(name, forest, scaler) for every forest the prediction paths use"""
+    for model_type in ('packaging', 'carbon_footprint', 'esg_score'):
+        bundle = manager.get_bundle(model_type)
+        if isinstance(bundle.model, SeparateForests):
+            for score_type, forest in zip(ESG_SCORE_TYPES, bundle.model.forests):
+                yield f"{model_type}/{score_type}", forest, bundle.scaler
+        else:
+            yield model_type, bundle.model, bundle.scaler
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled tree engine benchmark")
+    parser.add_argument('--repeats', type=int, default=200, help="Calls per measurement")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    manager = MLModelManager()
+    manager.warmup(['packaging', 'carbon_footprint', 'esg_score'])
+
+    print(f"{'model':<24}{'rows':>7}{'sklearn p50':>14}{'p99':>9}{'compiled p50':>15}{'p99':>9}{'speedup':>9}")
+    for name, forest, scaler in forests(manager):
+        compiled = CompiledForest.from_forest(forest, scaler)
+
+        check = compiled.sample_inputs(10000, seed=1)
+        expected = forest.predict(scaler.transform(check) if scaler is not None else check)
+        if not np.array_equal(expected, compiled.predict(check)):
+            print(f"{name}: compiled predictions differ from sklearn")
+            return 1
+
+        for n_rows in (1, 10, 100, 1000):
+            X = compiled.sample_inputs(n_rows, seed=2)
+            repeats = max(args.repeats // max(n_rows // 10, 1), 5)
+
+            def sklearn_predict():
+                forest.predict(scaler.transform(X) if scaler is not None else X)
+
+            baseline = time_calls(sklearn_predict, repeats)
+            engine = time_calls(lambda: compiled.predict(X), repeats)
+            print(f"{name:<24}{n_rows:>7}"
+                  f"{np.percentile(baseline, 50):>12.3f}ms{np.percentile(baseline, 99):>7.3f}ms"
+                  f"{np.percentile(engine, 50):>13.3f}ms{np.percentile(engine, 99):>7.3f}ms"
+                  f"{np.percentile(baseline, 50) / np.percentile(engine, 50):>8.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
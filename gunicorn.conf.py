@@ -0,0 +1,18 @@
+# Gunicorn configuration, picked up automatically from the working directory.
+#
+# Models load lazily on first use by default. Set MODEL_EAGER_WARMUP=true to load
+# every model family up front instead: with GUNICORN_PRELOAD=true the master loads
+# them once before forking so workers share the memory, otherwise each worker
+# warms up in post_fork before it accepts requests.
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+def post_fork(server, worker):
+    from models.ml_models import MLModelManager
+
+    manager = MLModelManager()
+    if manager.eager_warmup:
+        # No-op for families the preloaded master already warmed up
+        manager.warmup()
+        server.log.info(f"Worker {worker.pid} warmed up models: {manager.get_model_status()}")
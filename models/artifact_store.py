@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import sklearn
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_artifacts')
+
+ARTIFACT_FILE = 'artifacts.joblib'
+METADATA_FILE = 'metadata.json'
+
+
+class ModelArtifactStore:
+    """On-disk store for trained models, encoders and scalers.
+
+    Artifacts are saved per model type in a directory named after a hash of
+    the training config, so a changed config (or library version) never
+    loads a stale model.
+    """
+
+    def __init__(self, root_dir=None):
+        self.root_dir = root_dir or os.environ.get('MODEL_ARTIFACT_DIR', DEFAULT_ARTIFACT_DIR)
+
+    @staticmethod
+    def config_hash(config):
+        """Hash a training config together with the library versions it was trained with"""
+        payload = {
+            'config': config,
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def artifact_dir(self, model_type, config):
+        """Directory holding the artifacts for a model type and config"""
+        return os.path.join(self.root_dir, model_type, self.config_hash(config))
+
+    def exists(self, model_type, config):
+        """Check whether artifacts for this config have been saved"""
+        return os.path.exists(os.path.join(self.artifact_dir(model_type, config), ARTIFACT_FILE))
+
+    def load(self, model_type, config):
+        """Load artifacts for a model type, or return None on a miss"""
+        path = os.path.join(self.artifact_dir(model_type, config), ARTIFACT_FILE)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            artifacts = joblib.load(path)
+            logging.info(f"Loaded {model_type} artifacts from {path}")
+            return artifacts
+        except Exception as e:
+            logging.error(f"Error loading {model_type} artifacts from {path}: {str(e)}")
+            return None
+
+    def save(self, model_type, config, artifacts):
+        """Save artifacts for a model type; returns the artifact directory or None on failure"""
+        target_dir = self.artifact_dir(model_type, config)
+        tmp_dir = None
+
+        try:
+            parent_dir = os.path.dirname(target_dir)
+            os.makedirs(parent_dir, exist_ok=True)
+
+            # Write into a temporary directory and swap it in, so readers never see a partial file
+            tmp_dir = tempfile.mkdtemp(dir=parent_dir, prefix='.tmp-')
+            joblib.dump(artifacts, os.path.join(tmp_dir, ARTIFACT_FILE), compress=3)
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                json.dump({
+                    'model_type': model_type,
+                    'config': config,
+                    'config_hash': self.config_hash(config),
+                    'sklearn': sklearn.__version__,
+                    'numpy': np.__version__
+                }, f, indent=2, sort_keys=True, default=str)
+
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            os.replace(tmp_dir, target_dir)
+
+            logging.info(f"Saved {model_type} artifacts to {target_dir}")
+            return target_dir
+
+        except Exception as e:
+            if tmp_dir and os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            # Read-only filesystems (e.g. serverless) simply fall back to in-memory models
+            logging.warning(f"Could not save {model_type} artifacts to {target_dir}: {str(e)}")
+            return None
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+
+class UnknownCategoryError(ValueError):
+    """Raised for a categorical value the model was not trained on"""
+
+    def __init__(self, field, value, known):
+        self.field = field
+        self.value = value
+        self.known = list(known)
+        super().__init__(f"Unknown {field} '{value}'; expected one of: {', '.join(map(str, self.known))}")
+
+
+class CategoryEncoder:
+    """Plain dict lookup form of a fitted LabelEncoder.
+
+    LabelEncoder.transform builds arrays and searches them for every call, which
+    costs as much as a single prediction; encode() is one dict lookup, and
+    encode_column() encodes a whole column through pandas categorical codes.
+    Codes match the LabelEncoder's, so models trained on its codes are unaffected.
+    """
+
+    def __init__(self, field, classes):
+        self.field = field
+        self.classes = np.asarray(classes, dtype=object)
+        self.codes = {label: code for code, label in enumerate(self.classes.tolist())}
+
+    @classmethod
+    def from_label_encoder(cls, field, encoder):
+        return cls(field, encoder.classes_)
+
+    def encode(self, value):
+        """Code of one value; raises UnknownCategoryError for unseen values"""
+        try:
+            return self.codes[value]
+        except (KeyError, TypeError):
+            raise UnknownCategoryError(self.field, value, self.classes) from None
+
+    def encode_column(self, values):
+        """Codes of a column of values and a mask of known values (unseen values get code -1)"""
+        codes = pd.Categorical(values, categories=self.classes).codes.astype(np.int64)
+        return codes, codes >= 0
+
+    def decode(self, codes):
+        """Values of an array of codes"""
+        return self.classes[np.asarray(codes, dtype=np.int64)]
+
+    def error(self, value):
+        """The UnknownCategoryError for an unseen value"""
+        return UnknownCategoryError(self.field, value, self.classes)
@@ -1,7 +1,9 @@
 import os
+import logging
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.schema import CreateIndex
 
 db = SQLAlchemy()
 
@@ -17,6 +19,12 @@ class Prediction(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     ip_address = db.Column(db.String(45))
     
+    __table_args__ = (
+        # Newest-first listings, overall and per model type; id breaks created_at ties
+        db.Index('ix_predictions_created_at_id', 'created_at', 'id'),
+        db.Index('ix_predictions_model_type_created_at_id', 'model_type', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -42,21 +50,69 @@ class BatchProcessing(db.Model):
     results_summary = db.Column(JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     ip_address = db.Column(db.String(45))
+    # Background jobs: queued -> running -> completed or failed. total_rows is an
+    # estimate until the job completes; processed_rows is updated after every chunk.
+    status = db.Column(db.String(20), nullable=False, default='completed', server_default='completed')
+    processed_rows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    error_message = db.Column(db.Text)
+    result_path = db.Column(db.String(500))
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_batch_processing_created_at', 'created_at'),
+    )
+    
+    @property
+    def progress(self):
+        """Percentage of rows processed so far"""
+        if self.status == 'completed':
+            return 100.0
+        if not self.total_rows:
+            return 0.0
+        return round(min(self.processed_rows / self.total_rows, 1.0) * 100, 1)
     
     def to_dict(self):
         return {
             'id': self.id,
             'filename': self.filename,
             'model_type': self.model_type,
+            'status': self.status,
+            'progress': self.progress,
             'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
             'successful_rows': self.successful_rows,
             'failed_rows': self.failed_rows,
             'success_rate': round((self.successful_rows / self.total_rows) * 100, 2) if self.total_rows > 0 else 0,
             'processing_time': self.processing_time,
             'results_summary': self.results_summary,
-            'created_at': self.created_at.isoformat()
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
+class BatchResult(db.Model):
+    """One row result of a batch, as returned by DataProcessor.process_batch"""
+    __tablename__ = 'batch_results'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('batch_processing.id', ondelete='CASCADE'), nullable=False)
+    row_index = db.Column(db.Integer, nullable=False)
+    successful = db.Column(db.Boolean, nullable=False)
+    result = db.Column(JSON, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('batch_id', 'row_index', name='uq_batch_results_batch_row'),
+        # Failed rows only, for status=failed listings; the predicate is written as the
+        # query filter (successful IS false) so both databases match it to the index
+        db.Index('ix_batch_results_failed', 'batch_id', 'row_index',
+                 postgresql_where=successful.is_(False), sqlite_where=successful.is_(False)),
+    )
+    
+    def to_dict(self):
+        return self.result
+
 class ModelPerformance(db.Model):
     __tablename__ = 'model_performance'
     
@@ -93,6 +149,10 @@ class UserSession(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_activity = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_user_sessions_last_activity', 'last_activity'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -113,13 +173,161 @@ class SystemStats(db.Model):
     avg_processing_time = db.Column(db.Float, default=0.0)
     most_used_model = db.Column(db.String(50))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Running batch totals, so the dashboard never aggregates batch_processing
+    total_batch_rows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    batch_processing_time = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
     
     def to_dict(self):
         return {
             'total_predictions': self.total_predictions,
             'total_batch_jobs': self.total_batch_jobs,
+            'total_batch_rows': self.total_batch_rows,
             'total_users': self.total_users,
             'avg_processing_time': self.avg_processing_time,
             'most_used_model': self.most_used_model,
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class PredictionRollup(db.Model):
+    """Prediction totals of one model type over one hour or one day
+    
+    Kept up to date as predictions are written, so dashboards read a few rollup
+    rows instead of aggregating the predictions table. Averages are sums over
+    counts of the rows that had a value.
+    """
+    __tablename__ = 'prediction_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('period', 'bucket_start', 'model_type', name='uq_prediction_rollups_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    model_type = db.Column(db.String(50), nullable=False)
+    prediction_count = db.Column(db.Integer, nullable=False, default=0)
+    processing_time_sum = db.Column(db.Float, nullable=False, default=0.0)
+    processing_time_count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @property
+    def avg_processing_time(self):
+        return self.processing_time_sum / self.processing_time_count if self.processing_time_count else None
+    
+    @property
+    def avg_confidence(self):
+        return self.confidence_sum / self.confidence_count if self.confidence_count else None
+    
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'bucket_start': self.bucket_start.isoformat(),
+            'model_type': self.model_type,
+            'prediction_count': self.prediction_count,
+            'avg_processing_time': self.avg_processing_time,
+            'avg_confidence': self.avg_confidence
+        }
+
+# Columns added to existing tables after they were first created. db.create_all()
+# only creates missing tables, so ensure_schema() adds these to older databases.
+ADDED_COLUMNS = {
+    'batch_processing': ['status', 'processed_rows', 'error_message', 'result_path', 'started_at', 'completed_at'],
+    'system_stats': ['total_batch_rows', 'batch_processing_time']
+}
+
+def ensure_schema():
+    """Add any columns in ADDED_COLUMNS that an existing table is missing"""
+    inspector = db.inspect(db.engine)
+    dialect = db.engine.dialect
+    
+    for table_name, column_names in ADDED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue
+        
+        existing = {column['name'] for column in inspector.get_columns(table_name)}
+        table = db.metadata.tables[table_name]
+        for column_name in column_names:
+            if column_name in existing:
+                continue
+            
+            column = table.columns[column_name]
+            ddl = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column.type.compile(dialect=dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            db.session.execute(db.text(ddl))
+            logging.info(f"Added column {table_name}.{column_name}")
+    
+    db.session.commit()
+
+def ensure_indexes():
+    """Create the indexes defined on the models that existing tables are missing
+    
+    db.create_all() only creates indexes along with new tables. Building an index on
+    a large table can take longer than a worker may spend booting, so this is not
+    run at startup: run it once per deploy with `python -m models.database --ensure-indexes`.
+    On PostgreSQL the indexes are built CONCURRENTLY, so writes are not blocked while
+    they build, and an index left INVALID by an interrupted build is dropped and rebuilt.
+    """
+    inspector = db.inspect(db.engine)
+    dialect = db.engine.dialect
+    created = []
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        invalid = _invalid_indexes(table.name) if dialect.name == 'postgresql' else set()
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing and index.name not in invalid:
+                continue
+            
+            ddl = str(CreateIndex(index).compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            if dialect.name == 'postgresql':
+                ddl = ddl.replace('INDEX', 'INDEX CONCURRENTLY', 1)
+                # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+                with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                    if index.name in invalid:
+                        connection.execute(db.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                        logging.info(f"Dropped invalid index {index.name} on {table.name}")
+                    connection.execute(db.text(ddl))
+            else:
+                db.session.execute(db.text(ddl))
+                db.session.commit()
+            logging.info(f"Created index {index.name} on {table.name}")
+            created.append(index.name)
+    
+    return created
+
+def _invalid_indexes(table_name):
+    """Names of the indexes of a PostgreSQL table that an interrupted CONCURRENTLY build left invalid"""
+    rows = db.session.execute(db.text(
+        "SELECT index_class.relname FROM pg_index "
+        "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+        "JOIN pg_class table_class ON table_class.oid = pg_index.indrelid "
+        "WHERE NOT pg_index.indisvalid AND table_class.relname = :table_name "
+        "AND pg_table_is_visible(table_class.oid)"
+    ), {'table_name': table_name}).fetchall()
+    db.session.commit()
+    return {row[0] for row in rows}
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Database maintenance")
+    parser.add_argument('--ensure-indexes', action='store_true',
+                        help="Create the model indexes existing tables are missing (run once per deploy)")
+    args = parser.parse_args()
+    
+    from app import app
+    # Run as __main__, this module is a second copy whose db is not bound to the app
+    from models import database
+    
+    with app.app_context():
+        if args.ensure_indexes:
+            created = database.ensure_indexes()
+            print(f"Created {len(created)} indexes: {', '.join(created) or 'none missing'}")
+        else:
+            parser.print_help()
@@ -0,0 +1,121 @@
+import itertools
+from bisect import bisect_left
+
+import numpy as np
+
+from models.tree_engine import FLOAT32_MAX, fold_thresholds
+
+
+class DecisionTable:
+    """Exact lookup-table form of a forest over categorical codes plus one continuous feature.
+
+    With every categorical feature fixed, the forest is a piecewise-constant function of
+    the continuous feature that only changes at split thresholds. The table stores, for
+    each combination of categorical codes, the sorted thresholds where the predicted label
+    changes and the label of each interval, so a prediction is a binary search.
+    Thresholds are folded like the compiled tree engine's, so raw float64 inputs land in
+    the same interval as sklearn's float32 comparison would put them.
+    """
+
+    def __init__(self, tables, categories, continuous_index):
+        self.tables = tables
+        self.categories = categories
+        self.cardinalities = tuple(len(values) for values in categories)
+        self.continuous_index = continuous_index
+
+    @classmethod
+    def from_forest(cls, forest, categories, continuous_index=0, labels=None):
+        """Build a table from a fitted classifier.
+
+        categories lists the values of each categorical feature in code order (e.g. a
+        LabelEncoder's classes_), in feature order with the continuous feature left out.
+        labels maps the forest's classes to the values the table returns (defaults to
+        the classes themselves).
+        """
+        categories = [list(values) for values in categories]
+        thresholds = []
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            splits = (tree.children_left != -1) & (tree.feature == continuous_index)
+            thresholds.append(tree.threshold[splits])
+        bounds = np.unique(fold_thresholds(np.concatenate(thresholds), 0.0, 1.0))
+
+        # Each interval's right end lies inside it, and so does anything above the last bound
+        representatives = np.append(bounds, np.nextafter(bounds[-1], np.inf) if bounds.size else 0.0)
+        combinations = list(itertools.product(*[range(len(values)) for values in categories]))
+
+        rows = _feature_rows(representatives, combinations, continuous_index)
+        predicted = forest.predict(rows).reshape(len(combinations), len(representatives))
+        if labels is not None:
+            predicted = np.asarray(labels)[np.searchsorted(forest.classes_, predicted)]
+
+        tables = {}
+        for combination, interval_labels in zip(combinations, predicted):
+            # Only keep the bounds where the label actually changes
+            changes = np.flatnonzero(interval_labels[1:] != interval_labels[:-1])
+            tables[combination] = (
+                bounds[changes].tolist(),
+                interval_labels[np.append(changes, len(interval_labels) - 1)].tolist()
+            )
+
+        return cls(tables, categories, continuous_index)
+
+    @property
+    def n_bounds(self):
+        return sum(len(bounds) for bounds, _ in self.tables.values())
+
+    @staticmethod
+    def answerable(value):
+        """Whether the table can answer for a continuous value (NaN and huge values go to the forest)"""
+        return not np.isnan(value) and abs(value) <= FLOAT32_MAX
+
+    def lookup(self, value, codes):
+        """Label for one continuous value and a tuple of categorical codes"""
+        bounds, labels = self.tables[codes]
+        return labels[bisect_left(bounds, value)]
+
+    def lookup_batch(self, values, codes):
+        """Labels for arrays of continuous values and an (n_rows, n_categorical) array of codes"""
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.asarray(codes, dtype=np.int64)
+        result = np.empty(len(values), dtype=object)
+        if len(values) == 0:
+            return result
+
+        # Group rows by combination so each one is a single searchsorted
+        strides = np.cumprod((1,) + self.cardinalities[:0:-1])[::-1]
+        keys = codes @ strides
+        for key in np.unique(keys):
+            rows = np.flatnonzero(keys == key)
+            combination = tuple(int(code) for code in codes[rows[0]])
+            bounds, labels = self.tables[combination]
+            positions = np.searchsorted(np.asarray(bounds), values[rows], side='left')
+            result[rows] = np.asarray(labels, dtype=object)[positions]
+        return result
+
+    def verify(self, forest, labels=None, grid_size=2048):
+        """Check exact agreement with the forest on a dense grid around every threshold"""
+        all_bounds = np.unique(np.concatenate([np.asarray(b, dtype=np.float64) for b, _ in self.tables.values()] + [[0.0]]))
+        grid = np.concatenate([
+            all_bounds,
+            np.nextafter(all_bounds, np.inf),
+            np.nextafter(all_bounds, -np.inf),
+            np.linspace(all_bounds.min() - 1.0, all_bounds.max() + 1.0, grid_size)
+        ])
+        combinations = list(self.tables)
+        rows = _feature_rows(grid, combinations, self.continuous_index)
+
+        expected = forest.predict(rows)
+        if labels is not None:
+            expected = np.asarray(labels)[np.searchsorted(forest.classes_, expected)]
+        codes = np.repeat(np.asarray(combinations, dtype=np.int64), len(grid), axis=0)
+        actual = self.lookup_batch(np.tile(grid, len(combinations)), codes)
+        return bool(np.array_equal(expected.astype(object), actual))
+
+
+def _feature_rows(values, combinations, continuous_index):
+    """Feature matrix with every continuous value for every categorical combination"""
+    n_values = len(values)
+    categorical = np.repeat(np.asarray(combinations, dtype=np.float64), n_values, axis=0)
+    continuous = np.tile(np.asarray(values, dtype=np.float64), len(combinations))
+    return np.insert(categorical, continuous_index, continuous, axis=1)
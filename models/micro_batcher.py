@@ -0,0 +1,105 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Groups concurrent single predictions into one batch call.
+
+    Each submitted item waits at most max_wait seconds after the first item of its
+    batch arrived, or until max_batch_size items have been collected. A worker thread
+    then calls predict_batch(items), which must return one result per item in order,
+    and resolves each caller's future with its own result.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait=0.002, name='micro-batcher'):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait), 0.0)
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = Counter()
+
+    def submit(self, item):
+        """Queue an item for the next batch; returns a Future for its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item):
+        """Predict one item as part of a batch, blocking until its result is ready"""
+        return self.submit(item).result()
+
+    def stats(self):
+        """Batch fill metrics since startup"""
+        with self._lock:
+            batches = self._batches
+            items = self._items
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+        avg_batch_size = items / batches if batches else 0.0
+        return {
+            'window_ms': round(self.max_wait * 1000, 3),
+            'max_batch_size': self.max_batch_size,
+            'batches': batches,
+            'items': items,
+            'avg_batch_size': round(avg_batch_size, 2),
+            'fill_ratio': round(avg_batch_size / self.max_batch_size, 3),
+            'batch_sizes': batch_sizes
+        }
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so a forked server worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] += 1
+
+        try:
+            results = self.predict_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch prediction returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logging.error(f"{self.name} batch prediction error: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
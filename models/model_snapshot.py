@@ -0,0 +1,69 @@
+from types import MappingProxyType
+
+
+class ModelBundle:
+    """Everything one model family needs to predict: model, encoders, scaler and compiled forms.
+
+    Bundles are built completely before they are published and never mutated afterwards,
+    so a prediction that holds a bundle always sees a model with its own encoders.
+    They are plain picklable objects, so training workers can build them in another process.
+    """
+
+    def __init__(self, model_type, model, version, encoders=None, scaler=None,
+                 compiled=None, decision_table=None, product_data=None, category_encoders=None,
+                 recommendation_index=None, trained_at=None):
+        self.model_type = model_type
+        self.model = model
+        self.version = version
+        # When the model was trained (saved with its artifacts), so a retrain with the
+        # same config still gets a new cache_version
+        self.trained_at = trained_at
+        self.encoders = encoders or {}
+        # Dict lookup forms of the label encoders, used for prediction
+        self.category_encoders = category_encoders or {}
+        self.scaler = scaler
+        self.compiled = compiled
+        self.decision_table = decision_table
+        self.product_data = product_data
+        # Partitioned form of product_data, used for recommendations
+        self.recommendation_index = recommendation_index
+
+    @property
+    def cache_version(self):
+        """Version prediction cache keys are namespaced by: the config hash and training time"""
+        return f"{self.version}@{self.trained_at}"
+
+    def artifacts(self):
+        """The artifacts dict saved to the artifact store"""
+        artifacts = {'model': self.model}
+        if self.trained_at is not None:
+            artifacts['trained_at'] = self.trained_at
+        if self.encoders:
+            artifacts['encoders'] = dict(self.encoders)
+        if self.scaler is not None:
+            artifacts['scaler'] = self.scaler
+        if self.product_data is not None:
+            artifacts['product_data'] = self.product_data
+        return artifacts
+
+
+class ModelSnapshot:
+    """Immutable set of model bundles, one per loaded model family.
+
+    Loading or retraining a family builds a new snapshot with its bundle replaced,
+    and the manager publishes it with a single reference assignment.
+    """
+
+    def __init__(self, bundles=None, version=0):
+        self.bundles = MappingProxyType(dict(bundles or {}))
+        self.version = version
+
+    def get(self, model_type):
+        """Bundle for a model family, or None if it is not loaded"""
+        return self.bundles.get(model_type)
+
+    def replace(self, *bundles):
+        """New snapshot with the given bundles added or replaced"""
+        merged = dict(self.bundles)
+        merged.update((bundle.model_type, bundle) for bundle in bundles)
+        return ModelSnapshot(merged, self.version + 1)
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by get_many for keys that are not cached
+MISS = object()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of prediction results with a time to live.
+
+    Keys are (model_type, model_version, normalized_input) tuples, so a new model
+    version never reads results of an older one; invalidate(model_type) drops a
+    family's entries outright when it is retrained. Cached values are shared
+    between callers and must not be mutated. A max_size of 0 disables the cache.
+    """
+
+    def __init__(self, max_size=10000, ttl=3600):
+        self.max_size = max(int(max_size), 0)
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """Cached value for a key, or MISS"""
+        return self.get_many([key])[0]
+
+    def set(self, key, value):
+        """Cache a value, evicting the least recently used entries beyond max_size"""
+        self.set_many([(key, value)])
+
+    def get_many(self, keys):
+        """Cached values for a list of keys, with MISS for keys that are not cached"""
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self._expirations += 1
+                    entry = None
+                if entry is None:
+                    self._misses += 1
+                    values.append(MISS)
+                else:
+                    self._hits += 1
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        return values
+
+    def set_many(self, items):
+        """Cache a list of (key, value) pairs"""
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, model_type):
+        """Drop every cached result of a model family"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == model_type]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit and miss counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': 'memory',
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
+
+
+class SharedPredictionCache:
+    """Prediction cache in a SQLite database in WAL mode, shared by every worker on a host.
+
+    Same interface as PredictionCache. Entries are namespaced by model type and
+    version, values are stored as JSON, and recency is tracked to the second, so eviction
+    is approximately least recently used. The size is trimmed back to max_size
+    after every max_size // 100 inserts, so it can briefly run over by about 1%.
+    Hit and miss counters are per process.
+
+    The default path is in a directory of the temp directory that only the process
+    user can access, and a database file owned by another user is refused, since
+    any process that can write the file controls what every worker reads back.
+    """
+
+    def __init__(self, path=None, max_size=10000, ttl=3600):
+        self.path = path or os.path.join(_private_directory(), 'prediction_cache.sqlite3')
+        self.max_size = max(int(max_size), 0)
+        self.ttl = float(ttl)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._inserts_since_trim = 0
+        if self.enabled:
+            self._connection()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def _connection(self):
+        """SQLite connection of the current thread, opened on first use in each process"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        _check_owner(self.path)
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS prediction_cache ('
+            'namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL, '
+            'PRIMARY KEY (namespace, key)) WITHOUT ROWID'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_prediction_cache_accessed_at ON prediction_cache (accessed_at)')
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _split_key(key):
+        model_type, version, normalized = key
+        return f"{model_type}:{version}", json.dumps(normalized)
+
+    def get(self, key):
+        """Cached value for a key, or MISS"""
+        return self.get_many([key])[0]
+
+    def set(self, key, value):
+        """Cache a value"""
+        self.set_many([(key, value)])
+
+    def get_many(self, keys):
+        """Cached values for a list of keys, with MISS for keys that are not cached"""
+        values = [MISS] * len(keys)
+        now = time.time()
+        try:
+            connection = self._connection()
+            positions = {}
+            for position, key in enumerate(keys):
+                positions.setdefault(self._split_key(key), []).append(position)
+
+            touched = []
+            by_namespace = {}
+            for namespace, key in positions:
+                by_namespace.setdefault(namespace, []).append(key)
+            for namespace, namespace_keys in by_namespace.items():
+                # Stay well below SQLite's limit on bound parameters
+                for start in range(0, len(namespace_keys), 500):
+                    chunk = namespace_keys[start:start + 500]
+                    rows = connection.execute(
+                        'SELECT key, value, accessed_at FROM prediction_cache '
+                        f"WHERE namespace = ? AND expires_at > ? AND key IN ({','.join('?' * len(chunk))})",
+                        [namespace, now] + chunk
+                    ).fetchall()
+                    for key, value, accessed_at in rows:
+                        try:
+                            value = json.loads(value)
+                        except ValueError:
+                            # Not written by this version of the cache
+                            continue
+                        for position in positions[(namespace, key)]:
+                            values[position] = value
+                        if accessed_at < now - 1:
+                            touched.append((now, namespace, key))
+
+            if touched:
+                connection.executemany('UPDATE prediction_cache SET accessed_at = ? WHERE namespace = ? AND key = ?', touched)
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Shared prediction cache read error: {str(e)}")
+
+        hits = sum(1 for value in values if value is not MISS)
+        with self._lock:
+            self._hits += hits
+            self._misses += len(values) - hits
+        return values
+
+    def set_many(self, items):
+        """Cache a list of (key, value) pairs"""
+        if not self.enabled or not items:
+            return
+
+        now = time.time()
+        rows = [self._split_key(key) + (json.dumps(value), now + self.ttl, now)
+                for key, value in items]
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute('BEGIN')
+                connection.executemany('INSERT OR REPLACE INTO prediction_cache VALUES (?, ?, ?, ?, ?)', rows)
+
+            with self._lock:
+                self._inserts_since_trim += len(rows)
+                trim = self._inserts_since_trim >= max(self.max_size // 100, 1)
+                if trim:
+                    self._inserts_since_trim = 0
+            if trim:
+                self._trim(connection, now)
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Shared prediction cache write error: {str(e)}")
+
+    def _trim(self, connection, now):
+        """Delete expired entries, then the least recently used ones beyond max_size"""
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM prediction_cache WHERE expires_at <= ?', [now])
+            excess = connection.execute('SELECT COUNT(*) FROM prediction_cache').fetchone()[0] - self.max_size
+            if excess > 0:
+                connection.execute(
+                    'DELETE FROM prediction_cache WHERE (namespace, key) IN '
+                    '(SELECT namespace, key FROM prediction_cache ORDER BY accessed_at LIMIT ?)',
+                    [excess]
+                )
+                with self._lock:
+                    self._evictions += excess
+
+    def invalidate(self, model_type):
+        """Drop every cached result of a model family, for all workers"""
+        try:
+            self._connection().execute('DELETE FROM prediction_cache WHERE namespace GLOB ?', [f"{model_type}:*"])
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Shared prediction cache invalidation error: {str(e)}")
+
+    def clear(self):
+        try:
+            self._connection().execute('DELETE FROM prediction_cache')
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Shared prediction cache clear error: {str(e)}")
+
+    def stats(self):
+        """Hit and miss counters of this process and the shared size"""
+        try:
+            size = self._connection().execute('SELECT COUNT(*) FROM prediction_cache').fetchone()[0] if self.enabled else 0
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'enabled': self.enabled,
+                'size': size,
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions
+            }
+
+
+def _private_directory():
+    """Directory in the temp directory only the process user can access, created if missing"""
+    directory = os.path.join(tempfile.gettempdir(), f'sustainability-cache-{os.getuid()}')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    # An existing directory may have been created by someone else, or with a looser mode
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Cache directory {directory} must be a directory owned by this user with mode 0700")
+    return directory
+
+
+def _check_owner(path):
+    """Refuse a cache database that is a symlink or belongs to another user"""
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"Cache database {path} must be a regular file owned by this user")
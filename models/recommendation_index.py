@@ -0,0 +1,171 @@
+import numbers
+
+import numpy as np
+
+TOP_K = 5
+
+# Rows scanned first in score order before the scan window doubles
+SCAN_CHUNK = 64
+
+# Budgets scanned together by RecommendationIndex.recommend_many
+SCAN_BUDGETS = 256
+
+
+class RecommendationIndex:
+    """Product catalog partitioned for top-k recommendation queries without pandas.
+
+    Each (category, eco_only) partition holds its rows sorted by recommendation score
+    (highest first, ties in catalog order, as DataFrame.nlargest keeps them) and the same
+    rows sorted by price, with each row's rank in score order. A query takes whichever is
+    cheaper: scan the score order for the first k rows within budget, or bisect the price
+    order for the rows within budget and argpartition their score ranks. The eco_only=False
+    partition of a category holds all of its products.
+    """
+
+    def __init__(self, columns, partitions):
+        self.columns = columns
+        self.partitions = partitions
+
+    @classmethod
+    def from_products(cls, products):
+        """Build the index from a product catalog DataFrame"""
+        columns = {
+            'product_id': products['product_id'].to_numpy(dtype=np.int64),
+            'sustainability_score': products['sustainability_score'].to_numpy(dtype=np.float64),
+            'price': products['price'].to_numpy(dtype=np.float64),
+            'rating': products['rating'].to_numpy(dtype=np.float64),
+            'eco_friendly': products['eco_friendly'].to_numpy() == 1,
+            'recommendation_score': products['recommendation_score'].to_numpy(dtype=np.float64)
+        }
+        categories = products['category'].astype(object).to_numpy()
+        prices = columns['price']
+        scores = columns['recommendation_score']
+
+        # Catalog positions from highest to lowest score, ties and NaN scores in catalog order
+        positions = np.arange(len(products))
+        score_order = np.lexsort((positions, -scores, np.isnan(scores)))
+        # Rows without a price never fit a budget
+        score_order = score_order[~np.isnan(prices[score_order])]
+
+        partitions = {}
+        ordered_categories = categories[score_order]
+        for category in dict.fromkeys(ordered_categories.tolist()):
+            if not isinstance(category, str):
+                continue
+            rows = score_order[ordered_categories == category]
+            partitions[(category, False)] = _Partition(category, rows, prices)
+            partitions[(category, True)] = _Partition(category, rows[columns['eco_friendly'][rows]], prices)
+
+        return cls(columns, partitions)
+
+    @property
+    def n_products(self):
+        return len(self.columns['product_id'])
+
+    def recommend(self, category, budget, eco_priority, k=TOP_K):
+        """Top k products of a category within budget (eco-friendly only if eco_priority)"""
+        if not isinstance(budget, numbers.Real):
+            raise TypeError(f"Budget must be a number, got {type(budget).__name__}")
+
+        partition = self.partitions.get((category, bool(eco_priority)))
+        if partition is None or np.isnan(budget):
+            return []
+        return self._records(partition.category, partition.top_k(budget, k))
+
+    def recommend_many(self, category, budgets, eco_priority, k=TOP_K):
+        """Recommendations for a list of budgets in one category, in one pass over its partition"""
+        budgets = np.asarray(budgets, dtype=np.float64)
+        partition = self.partitions.get((category, bool(eco_priority)))
+        if partition is None:
+            return [[] for _ in range(len(budgets))]
+
+        answered = ~np.isnan(budgets)
+        recommendations = [[] for _ in range(len(budgets))]
+        for position, rows in zip(np.flatnonzero(answered).tolist(), partition.top_k_many(budgets[answered], k)):
+            recommendations[position] = self._records(partition.category, rows)
+        return recommendations
+
+    def _records(self, category, rows):
+        columns = self.columns
+        return [
+            {
+                'product_id': int(columns['product_id'][row]),
+                'category': category,
+                'sustainability_score': round(float(columns['sustainability_score'][row]), 2),
+                'price': round(float(columns['price'][row]), 2),
+                'rating': round(float(columns['rating'][row]), 2),
+                'eco_friendly': bool(columns['eco_friendly'][row]),
+                'recommendation_score': round(float(columns['recommendation_score'][row]), 2)
+            }
+            for row in rows.tolist()
+        ]
+
+
+class _Partition:
+    """Rows of one (category, eco_only) partition in score order and in price order"""
+
+    def __init__(self, category, rows, prices):
+        self.category = category
+        # Catalog rows and their prices, best score first
+        self.rows = rows
+        self.prices = prices[rows]
+        # Prices ascending, with the score rank of each
+        self.price_ranks = np.argsort(self.prices, kind='stable')
+        self.sorted_prices = self.prices[self.price_ranks]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def top_k(self, budget, k):
+        """Catalog rows of the k best scores with price <= budget, best first"""
+        affordable = int(np.searchsorted(self.sorted_prices, budget, side='right'))
+        if self._by_price(affordable, k):
+            return self.rows[self._top_ranks(affordable, k)]
+        return self.rows[self._scan([budget], k)[0]]
+
+    def top_k_many(self, budgets, k):
+        """top_k for an array of budgets, scanning the score order once for all of them"""
+        affordable = np.searchsorted(self.sorted_prices, budgets, side='right')
+        top_ranks = [None] * len(budgets)
+        scanned = []
+        for position, count in enumerate(affordable.tolist()):
+            if self._by_price(count, k):
+                top_ranks[position] = self._top_ranks(count, k)
+            else:
+                scanned.append(position)
+
+        # Bound the scan's rows x budgets mask
+        for start in range(0, len(scanned), SCAN_BUDGETS):
+            block = scanned[start:start + SCAN_BUDGETS]
+            for position, ranks in zip(block, self._scan(budgets[block], k)):
+                top_ranks[position] = ranks
+        return [self.rows[ranks] for ranks in top_ranks]
+
+    def _by_price(self, affordable, k):
+        # A score-order scan reads about k * n / affordable rows before it finds k
+        return affordable * affordable <= k * len(self)
+
+    def _top_ranks(self, affordable, k):
+        """Score ranks of the k best of the affordable cheapest rows, best first"""
+        ranks = self.price_ranks[:affordable]
+        if affordable > k:
+            ranks = ranks[np.argpartition(ranks, k - 1)[:k]]
+        return np.sort(ranks)
+
+    def _scan(self, budgets, k):
+        """Score ranks of the first k rows within each budget, reading the score order in growing chunks"""
+        budgets = np.asarray(budgets, dtype=np.float64)
+        found = [[] for _ in range(len(budgets))]
+        pending = np.arange(len(budgets))
+        start, size = 0, max(SCAN_CHUNK, k)
+        while start < len(self) and pending.size:
+            stop = min(start + size, len(self))
+            within = self.prices[start:stop, None] <= budgets[None, pending]
+            needed = k - np.array([len(found[position]) for position in pending])
+            taken = within & (np.cumsum(within, axis=0) <= needed)
+            for column, position in enumerate(pending.tolist()):
+                found[position].extend((np.flatnonzero(taken[:, column]) + start).tolist())
+
+            pending = pending[taken.sum(axis=0) < needed]
+            start, size = stop, size * 2
+        return [np.asarray(ranks, dtype=np.int64) for ranks in found]
@@ -0,0 +1,107 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Finished jobs kept around for polling
+MAX_FINISHED_JOBS = 100
+
+
+class TrainingJob:
+    """Status and per-family results of one background training run"""
+
+    def __init__(self, model_types):
+        self.id = uuid.uuid4().hex
+        self.model_types = list(model_types)
+        self.status = 'queued'
+        self.results = {model_type: {'status': 'queued'} for model_type in self.model_types}
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.completed_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress(self):
+        """Fraction of model families that have finished training"""
+        if not self.model_types:
+            return 1.0
+        done = sum(1 for result in self.results.values() if result['status'] in ('ready', 'error'))
+        return round(done / len(self.model_types), 2)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'model_types': self.model_types,
+            'results': dict(self.results),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class TrainingJobQueue:
+    """Runs training jobs one at a time on a background thread.
+
+    train is called as train(model_types, progress) and must call
+    progress(model_type, result) as each family finishes.
+    """
+
+    def __init__(self, train):
+        self.train = train
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-training')
+
+    def submit(self, model_types, on_complete=None):
+        """Queue a training job; on_complete(job) is called from the worker thread when it finishes"""
+        job = TrainingJob(model_types)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, on_complete)
+        return job
+
+    def get(self, job_id):
+        """Look up a job by id, or None if it is unknown or has been pruned"""
+        return self.jobs.get(job_id)
+
+    def _run(self, job, on_complete):
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        for model_type in job.model_types:
+            job.results[model_type] = {'status': 'training'}
+
+        def progress(model_type, result):
+            job.results[model_type] = result
+
+        try:
+            self.train(job.model_types, progress)
+            failed = [model_type for model_type, result in job.results.items() if result['status'] != 'ready']
+            job.status = 'failed' if failed else 'completed'
+            if failed:
+                job.error = f"Training failed for: {', '.join(failed)}"
+        except Exception as e:
+            logging.error(f"Training job {job.id} error: {str(e)}")
+            job.status = 'failed'
+            job.error = str(e)
+        job.completed_at = datetime.utcnow()
+
+        if on_complete is not None:
+            try:
+                on_complete(job)
+            except Exception as e:
+                logging.error(f"Training job {job.id} completion callback error: {str(e)}")
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda job: job.created_at)[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job.id]
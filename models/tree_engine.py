@@ -0,0 +1,253 @@
+import numpy as np
+
+# sklearn casts inputs to float32 before walking its trees
+FLOAT32_MAX = np.finfo(np.float32).max
+
+# Rows evaluated per pass, bounding the (n_trees, n_rows) working arrays
+CHUNK_ROWS = 2048
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+def _ordered_bits(x):
+    """Map float64 values to int64 keys with the same ordering"""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return bits ^ ((bits >> 63) & _SIGN_MASK)
+
+def _from_ordered_bits(keys):
+    """Inverse of _ordered_bits"""
+    keys = np.asarray(keys, dtype=np.int64)
+    return (keys ^ ((keys >> 63) & _SIGN_MASK)).view(np.float64)
+
+def _goes_left(x, threshold, mean, scale):
+    """sklearn's split test on a raw value: scale in float64, round to float32, compare"""
+    return ((x - mean) / scale).astype(np.float32) <= threshold
+
+def fold_thresholds(threshold, mean, scale):
+    """Map split thresholds to raw feature units exactly.
+
+    For each split, returns the largest raw value x for which sklearn would take the
+    left branch after scaling x and rounding it to float32, so that comparing raw
+    inputs against the folded thresholds reproduces sklearn's decisions bit for bit.
+    The split test is monotone in x, so the boundary is found by bisecting over the
+    ordered float64 bit patterns around the algebraic fold t * scale + mean.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.broadcast_to(np.asarray(mean, dtype=np.float64), threshold.shape)
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), threshold.shape)
+
+    guess = threshold * scale + mean
+    width = (np.abs(guess) + np.abs(mean) + scale) * 1e-4 + 1e-300
+    low = guess - width
+    high = guess + width
+    # Widen until low goes left and high goes right
+    for _ in range(64):
+        bad_low = ~_goes_left(low, threshold, mean, scale)
+        bad_high = _goes_left(high, threshold, mean, scale)
+        if not (bad_low.any() or bad_high.any()):
+            break
+        width = np.where(bad_low | bad_high, width * 2, width)
+        low = np.where(bad_low, guess - width, low)
+        high = np.where(bad_high, guess + width, high)
+
+    low_keys = _ordered_bits(low)
+    high_keys = _ordered_bits(high)
+    while True:
+        open_intervals = high_keys - low_keys > 1
+        if not open_intervals.any():
+            break
+        mid_keys = low_keys + (high_keys - low_keys) // 2
+        left = _goes_left(_from_ordered_bits(mid_keys), threshold, mean, scale)
+        low_keys = np.where(open_intervals & left, mid_keys, low_keys)
+        high_keys = np.where(open_intervals & ~left, mid_keys, high_keys)
+    return _from_ordered_bits(low_keys)
+
+
+class CompiledForest:
+    """A fitted RandomForest flattened into packed NumPy node arrays.
+
+    Every tree's nodes are concatenated into shared feature/threshold/left/right/value
+    arrays, so a single vectorized loop walks all trees for all rows at once without
+    sklearn's per-call validation and joblib dispatch. Leaves point to themselves,
+    so rows that reach a leaf early simply stay there until the deepest tree is done.
+
+    Thresholds are folded into raw input units (see fold_thresholds), including
+    an optional StandardScaler and sklearn's float32 cast of the inputs, so
+    predict() takes unscaled float64 inputs and reproduces sklearn's predictions.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots,
+                 max_depth, n_features, classes=None, mean=None, scale=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.classes = classes
+        self.mean = mean
+        self.scale = scale
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def is_classifier(self):
+        return self.classes is not None
+
+    @classmethod
+    def from_forest(cls, forest, scaler=None):
+        """Compile a fitted RandomForestClassifier/Regressor, optionally folding in a StandardScaler"""
+        is_classifier = hasattr(forest, 'classes_')
+        if is_classifier and getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Multi-output classifiers are not supported")
+
+        mean = scale = None
+        if scaler is not None:
+            n_features = forest.n_features_in_
+            mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+            scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+            mean = np.asarray(mean, dtype=np.float64)
+            scale = np.asarray(scale, dtype=np.float64)
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes) + offset
+            is_leaf = tree.children_left == -1
+
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.intp)
+            threshold = np.full(n_nodes, np.inf)
+            splits = ~is_leaf
+            threshold[splits] = fold_thresholds(
+                tree.threshold[splits],
+                mean[feature[splits]] if scaler is not None else 0.0,
+                scale[feature[splits]] if scaler is not None else 1.0
+            )
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+            if missing_go_to_left is None:
+                missing_go_to_left = np.zeros(n_nodes, dtype=bool)
+            missing.append(np.asarray(missing_go_to_left, dtype=bool) | is_leaf)
+
+            value = tree.value[:, :, 0] if not is_classifier else tree.value[:, 0, :]
+            value = np.asarray(value, dtype=np.float64)
+            if is_classifier:
+                # Same normalization as DecisionTreeClassifier.predict_proba
+                normalizer = value.sum(axis=1)[:, None]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=forest.n_features_in_,
+            classes=forest.classes_ if is_classifier else None,
+            mean=mean,
+            scale=scale
+        )
+
+    def _check_input(self, X):
+        """Reject the inputs sklearn's own validation would reject"""
+        scaled = X if self.scale is None else (X - self.mean) / self.scale
+        if not np.all(np.isnan(scaled) | (np.abs(scaled) <= FLOAT32_MAX)):
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+
+    def _leaf_values(self, X):
+        """Sum the leaf values reached in every tree for a chunk of rows"""
+        n_rows = X.shape[0]
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        rows = np.arange(n_rows)[None, :]
+        has_nan = np.isnan(X).any()
+
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Cumulative sums add trees one at a time in order, exactly like sklearn's
+        # accumulation (a plain sum may use pairwise summation instead)
+        return np.cumsum(self.value[nodes], axis=0)[-1]
+
+    def predict_values(self, X):
+        """Averaged tree outputs: class probabilities or regression targets, shape (n_rows, n_outputs)"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        self._check_input(X)
+
+        if X.shape[0] <= CHUNK_ROWS:
+            totals = self._leaf_values(X)
+        else:
+            totals = np.concatenate([
+                self._leaf_values(X[start:start + CHUNK_ROWS])
+                for start in range(0, X.shape[0], CHUNK_ROWS)
+            ])
+        return totals / self.n_trees
+
+    def predict_proba(self, X):
+        """Class probabilities, as RandomForestClassifier.predict_proba"""
+        if not self.is_classifier:
+            raise ValueError("predict_proba is only available for classifiers")
+        return self.predict_values(X)
+
+    def predict(self, X):
+        """Predictions, as the compiled forest's predict"""
+        values = self.predict_values(X)
+        if self.is_classifier:
+            return self.classes.take(np.argmax(values, axis=1), axis=0)
+        if values.shape[1] == 1:
+            return values[:, 0]
+        return values
+
+    def sample_inputs(self, n_rows, seed=0):
+        """Random inputs spanning every feature's split range, for verification"""
+        rng = np.random.default_rng(seed)
+        low = np.zeros(self.n_features)
+        high = np.ones(self.n_features)
+        splits = np.isfinite(self.threshold)
+        for f in range(self.n_features):
+            thresholds = self.threshold[splits & (self.feature == f)]
+            if thresholds.size:
+                margin = max((thresholds.max() - thresholds.min()) * 0.1, 1.0)
+                low[f] = thresholds.min() - margin
+                high[f] = thresholds.max() + margin
+        return rng.uniform(low, high, size=(n_rows, self.n_features))
+
+    def verify(self, forest, X, scaler=None, rtol=1e-9, atol=1e-9):
+        """Check that predictions match the sklearn forest (and scaler) on X"""
+        X = np.asarray(X, dtype=np.float64)
+        expected = forest.predict(scaler.transform(X) if scaler is not None else X)
+        actual = self.predict(X)
+        if self.is_classifier:
+            return bool(np.array_equal(expected, actual))
+        return bool(np.allclose(expected, actual, rtol=rtol, atol=atol))
+
+
+def compile_forest(forest, scaler=None, n_check=512):
+    """Compile a forest and verify it against sklearn; returns None if the check fails"""
+    compiled = CompiledForest.from_forest(forest, scaler)
+    if not compiled.verify(forest, compiled.sample_inputs(n_check), scaler):
+        return None
+    return compiled
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Package the Sustainability Analytics Platform for GitHub/Vercel deployment
+Creates a clean deployment package with all necessary files
+"""
+
+import os
+import shutil
+import zipfile
+
+# Files and directories to include
+INCLUDE_FILES = [
+    "app.py",
+    "main.py",
+    "vercel.json",
+    "requirements-vercel.txt",
+    ".gitignore",
+    ".vercelignore",
+    "README-DEPLOYMENT.md"
+]
+
+INCLUDE_DIRS = [
+    "api",
+    "models",
+    "routes",
+    "templates",
+    "static",
+    "utils",
+    "data"
+]
+
+def collect_deployment_files(deploy_dir, extra_dirs=()):
+    """Copy the deployable files and directories into deploy_dir"""
+    if os.path.exists(deploy_dir):
+        shutil.rmtree(deploy_dir)
+    os.makedirs(deploy_dir)
+
+    # Copy files
+    for file in INCLUDE_FILES:
+        if os.path.exists(file):
+            shutil.copy2(file, os.path.join(deploy_dir, file))
+            print(f"Copied {file}")
+
+    # Copy directories
+    for dir_name in list(INCLUDE_DIRS) + list(extra_dirs):
+        if os.path.exists(dir_name):
+            shutil.copytree(dir_name, os.path.join(deploy_dir, dir_name),
+                            ignore=shutil.ignore_patterns('__pycache__', '*.pyc', '*.pyo', '.tmp-*'))
+            print(f"Copied directory {dir_name}")
+
+def create_zip(deploy_dir, zip_path):
+    """Zip the contents of deploy_dir"""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(deploy_dir):
+            # Skip __pycache__ directories
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+
+            for file in files:
+                if not file.endswith(('.pyc', '.pyo')):
+                    file_path = os.path.join(root, file)
+                    arc_path = os.path.relpath(file_path, deploy_dir)
+                    zipf.write(file_path, arc_path)
+
+def create_deployment_package(extra_dirs=()):
+    """Create a deployment-ready package"""
+
+    # Create deployment directory
+    deploy_dir = "deployment_package"
+    collect_deployment_files(deploy_dir, extra_dirs)
+
+    # Create zip file
+    zip_path = "sustainability_analytics_deployment.zip"
+    create_zip(deploy_dir, zip_path)
+
+    print(f"\nDeployment package created: {zip_path}")
+
+    # Clean up deployment directory
+    shutil.rmtree(deploy_dir)
+    print(f"Cleaned up {deploy_dir}")
+
+    return zip_path
+
+if __name__ == "__main__":
+    create_deployment_package()
@@ -1,16 +1,38 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, url_for, json, Response, stream_with_context
 from models.ml_models import MLModelManager
-from models.database import db, Prediction, BatchProcessing, ModelPerformance, UserSession
+from models.category_encoder import UnknownCategoryError
+from models.database import db, BatchProcessing, BatchResult, ModelPerformance, UserSession
 from utils.data_processor import DataProcessor
+from utils.batch_jobs import BatchJobQueue
+from utils.batch_results import store_batch_results, dumps_result
+from utils.rollups import record_batch
+from utils.prediction_logger import PredictionLogger
 import pandas as pd
 import io
 import logging
+import os
 import time
 from datetime import datetime
 
 api_bp = Blueprint('api', __name__)
 ml_manager = MLModelManager()
 data_processor = DataProcessor()
+batch_jobs = BatchJobQueue(data_processor)
+prediction_logger = PredictionLogger.from_env()
+
+# Most items accepted by one bulk prediction request
+MAX_BULK_ITEMS = int(os.environ.get('PREDICT_BATCH_MAX_ITEMS', 1000))
+
+# Most stored batch row results returned per page
+MAX_RESULTS_PER_PAGE = int(os.environ.get('BATCH_RESULTS_MAX_PER_PAGE', 1000))
+
+# Model types of the bulk prediction endpoints, by URL name
+BULK_MODEL_TYPES = {
+    'packaging': 'packaging',
+    'carbon-footprint': 'carbon_footprint',
+    'product-recommendation': 'product_recommendation',
+    'esg-score': 'esg_score'
+}
 
 @api_bp.route('/predict/packaging', methods=['POST'])
 def predict_packaging():
@@ -26,21 +48,8 @@ def predict_packaging():
         confidence = ml_manager.get_prediction_confidence('packaging', data)
         processing_time = time.time() - start_time
         
-        # Store prediction in database
-        try:
-            prediction_record = Prediction(
-                model_type='packaging',
-                input_data=data,
-                prediction_result={'prediction': prediction},
-                confidence_score=confidence,
-                processing_time=processing_time,
-                ip_address=request.remote_addr
-            )
-            db.session.add(prediction_record)
-            db.session.commit()
-        except Exception as db_error:
-            logging.error(f"Database error storing packaging prediction: {str(db_error)}")
-            # Continue without failing the prediction
+        # Queue the prediction for the database; the response does not wait for the write
+        log_prediction('packaging', data, {'prediction': prediction}, confidence, processing_time)
         
         return jsonify({
             'prediction': prediction,
@@ -49,6 +58,9 @@ def predict_packaging():
             'model_status': 'active'
         })
         
+    except UnknownCategoryError as e:
+        return jsonify({'error': str(e)}), 400
+        
     except Exception as e:
         logging.error(f"Packaging prediction API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -63,23 +75,11 @@ def predict_carbon_footprint():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        prediction = ml_manager.predict_carbon_footprint(data)
-        breakdown = ml_manager.get_carbon_breakdown(data)
+        prediction, breakdown = ml_manager.predict_carbon_footprint_with_breakdown(data)
         processing_time = time.time() - start_time
         
-        # Store prediction in database
-        try:
-            prediction_record = Prediction(
-                model_type='carbon_footprint',
-                input_data=data,
-                prediction_result={'prediction': prediction, 'breakdown': breakdown},
-                processing_time=processing_time,
-                ip_address=request.remote_addr
-            )
-            db.session.add(prediction_record)
-            db.session.commit()
-        except Exception as db_error:
-            logging.error(f"Database error storing carbon footprint prediction: {str(db_error)}")
+        # Queue the prediction for the database; the response does not wait for the write
+        log_prediction('carbon_footprint', data, {'prediction': prediction, 'breakdown': breakdown}, None, processing_time)
         
         return jsonify({
             'prediction': prediction,
@@ -89,6 +89,9 @@ def predict_carbon_footprint():
             'model_status': 'active'
         })
         
+    except UnknownCategoryError as e:
+        return jsonify({'error': str(e)}), 400
+        
     except Exception as e:
         logging.error(f"Carbon footprint prediction API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -96,12 +99,15 @@ def predict_carbon_footprint():
 @api_bp.route('/predict/product-recommendation', methods=['POST'])
 def predict_product_recommendation():
     """API endpoint for product recommendations"""
+    start_time = time.time()
+    
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         recommendations = ml_manager.predict_product_recommendations(data)
+        log_prediction('product_recommendation', data, {'recommendations': recommendations}, None, time.time() - start_time)
         
         return jsonify({
             'recommendations': recommendations,
@@ -115,12 +121,15 @@ def predict_product_recommendation():
 @api_bp.route('/predict/esg-score', methods=['POST'])
 def predict_esg_score():
     """API endpoint for ESG score analysis"""
+    start_time = time.time()
+    
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         esg_scores = ml_manager.predict_esg_score(data)
+        log_prediction('esg_score', data, {'esg_scores': esg_scores}, None, time.time() - start_time)
         
         return jsonify({
             'esg_scores': esg_scores,
@@ -131,6 +140,86 @@ def predict_esg_score():
         logging.error(f"ESG score prediction API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/predict/<model_name>/batch', methods=['POST'])
+def predict_bulk(model_name):
+    """API endpoint for bulk predictions from a JSON array of inputs
+    
+    Accepts a JSON array (or an object with an "items" array) of the inputs the
+    single-item endpoint takes. Returns one result per item, in order; items that
+    cannot be predicted get an error instead of failing the request.
+    """
+    start_time = time.time()
+    
+    model_type = BULK_MODEL_TYPES.get(model_name)
+    if model_type is None:
+        return jsonify({'error': f'Unknown model: {model_name}'}), 404
+    
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Expected a non-empty JSON array of inputs'}), 400
+        
+        if len(items) > MAX_BULK_ITEMS:
+            return jsonify({'error': f'Too many items: {len(items)} (maximum {MAX_BULK_ITEMS})'}), 413
+        
+        results = data_processor.process_items(items, model_type)
+        processing_time = time.time() - start_time
+        
+        successful = [result for result in results if 'error' not in result]
+        store_bulk_predictions(model_type, items, successful, processing_time / len(items))
+        
+        return jsonify({
+            'results': [bulk_item_result(result) for result in results],
+            'count': len(results),
+            'successful_count': len(successful),
+            'failed_count': len(results) - len(successful),
+            'processing_time': round(processing_time, 3),
+            'model_status': 'active'
+        })
+        
+    except Exception as e:
+        logging.error(f"Bulk {model_type} prediction API error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def bulk_item_result(result):
+    """Response entry for one bulk item: its index and prediction fields, or its error"""
+    item = {'index': result['row_index']}
+    item.update((key, value) for key, value in result.items() if key not in ('row_index', 'input_data', 'count'))
+    return item
+
+def log_prediction(model_type, data, prediction_result, confidence, processing_time):
+    """Queue one prediction of the current request for the database"""
+    try:
+        prediction_logger.log(
+            current_app._get_current_object(), model_type, data, prediction_result,
+            confidence_score=confidence,
+            processing_time=processing_time,
+            ip_address=request.remote_addr
+        )
+    except Exception as log_error:
+        logging.error(f"Error logging {model_type} prediction: {str(log_error)}")
+
+def store_bulk_predictions(model_type, items, results, processing_time):
+    """Queue the successful predictions of a bulk request for the database"""
+    try:
+        prediction_logger.log_many(current_app._get_current_object(), [
+            {
+                'model_type': model_type,
+                'input_data': items[result['row_index']],
+                'prediction_result': {
+                    key: value for key, value in result.items()
+                    if key not in ('row_index', 'input_data', 'confidence', 'count', 'unit')
+                },
+                'confidence_score': result.get('confidence'),
+                'processing_time': processing_time,
+                'ip_address': request.remote_addr
+            }
+            for result in results
+        ])
+    except Exception as log_error:
+        logging.error(f"Error logging bulk {model_type} predictions: {str(log_error)}")
+
 @api_bp.route('/batch-process', methods=['POST'])
 def batch_process():
     """API endpoint for batch processing CSV files"""
@@ -147,9 +236,8 @@ def batch_process():
         if not file.filename.endswith('.csv'):
             return jsonify({'error': 'File must be CSV format'}), 400
         
-        # Read CSV file
-        csv_data = file.read().decode('utf-8')
-        df = pd.read_csv(io.StringIO(csv_data))
+        # Read CSV file straight from the upload, without decoded copies of it
+        df = pd.read_csv(file.stream, encoding='utf-8', float_precision='round_trip')
         
         # Process batch data
         model_type = request.form.get('model_type', 'packaging')
@@ -160,27 +248,12 @@ def batch_process():
         successful_rows = len([r for r in results if 'error' not in r])
         failed_rows = len([r for r in results if 'error' in r])
         
-        # Store batch processing record
-        try:
-            batch_record = BatchProcessing(
-                filename=file.filename,
-                model_type=model_type,
-                total_rows=len(results),
-                successful_rows=successful_rows,
-                failed_rows=failed_rows,
-                processing_time=processing_time,
-                results_summary={
-                    'success_rate': round((successful_rows / len(results)) * 100, 2) if results else 0,
-                    'avg_processing_time_per_row': round(processing_time / len(results), 4) if results else 0
-                },
-                ip_address=request.remote_addr
-            )
-            db.session.add(batch_record)
-            db.session.commit()
-        except Exception as db_error:
-            logging.error(f"Database error storing batch processing: {str(db_error)}")
+        # Store batch processing record with its row results
+        batch_id = store_batch_record(file.filename, model_type, successful_rows, failed_rows, processing_time, results)
         
         return jsonify({
+            'batch_id': batch_id,
+            'results_url': url_for('api.get_batch_results', batch_id=batch_id) if batch_id is not None else None,
             'results': results,
             'processed_count': len(results),
             'successful_count': successful_rows,
@@ -194,33 +267,358 @@ def batch_process():
         logging.error(f"Batch processing API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/batch-process/stream', methods=['POST'])
+def batch_process_stream():
+    """API endpoint for streaming batch processing of CSV files
+    
+    Accepts the same multipart upload as /batch-process, or a raw text/csv body with
+    model_type (and optionally filename) in the query string. The CSV is read and
+    predicted in chunks, and results stream back as NDJSON: one line per row, then a
+    final summary line (or an error line if processing stops).
+    """
+    start_time = time.time()
+    
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not file.filename.endswith('.csv'):
+            return jsonify({'error': 'File must be CSV format'}), 400
+        
+        # Werkzeug spools large uploads to a temporary file, so this reads from disk.
+        # The request closes its files as soon as this view returns, before the response
+        # streams, so the generator takes the file over and closes it when it is done.
+        csv_stream = file.stream
+        file.stream = io.BytesIO()
+        filename = file.filename
+        model_type = request.form.get('model_type', 'packaging')
+    else:
+        csv_stream = request.stream
+        filename = request.args.get('filename', 'upload.csv')
+        model_type = request.args.get('model_type', 'packaging')
+    owns_stream = csv_stream is not request.stream
+    
+    if model_type not in ml_manager.model_status:
+        return jsonify({'error': f'Unknown model type: {model_type}'}), 400
+    
+    def generate():
+        successful_rows = 0
+        failed_rows = 0
+        error = None
+        # Row results are stored chunk by chunk, like a background job's
+        batch_id = start_stream_record(filename, model_type)
+        
+        try:
+            for results in data_processor.process_batch_chunks(csv_stream, model_type):
+                chunk_failed = sum(1 for r in results if 'error' in r)
+                successful_rows += len(results) - chunk_failed
+                failed_rows += chunk_failed
+                store_stream_chunk(batch_id, results, chunk_failed)
+                yield ''.join(dumps_result(result) + '\n' for result in results)
+        except Exception as e:
+            logging.error(f"Streaming batch processing error: {str(e)}")
+            error = str(e)
+            yield json.dumps({'error': str(e)}) + '\n'
+        finally:
+            if owns_stream:
+                csv_stream.close()
+        
+        processed_count = successful_rows + failed_rows
+        processing_time = time.time() - start_time
+        finish_stream_record(batch_id, processing_time, error)
+        
+        yield json.dumps({
+            'summary': {
+                'batch_id': batch_id,
+                'results_url': url_for('api.get_batch_results', batch_id=batch_id) if batch_id is not None else None,
+                'processed_count': processed_count,
+                'successful_count': successful_rows,
+                'failed_count': failed_rows,
+                'success_rate': round((successful_rows / processed_count) * 100, 2) if processed_count else 0,
+                'processing_time': round(processing_time, 3),
+                'model_type': model_type
+            }
+        }) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def store_batch_record(filename, model_type, successful_rows, failed_rows, processing_time, results=None):
+    """Store a batch processing record and optionally its row results, logging rather than failing on database errors
+    
+    Returns the record's id, or None if it could not be stored.
+    """
+    total_rows = successful_rows + failed_rows
+    try:
+        batch_record = BatchProcessing(
+            filename=filename,
+            model_type=model_type,
+            total_rows=total_rows,
+            processed_rows=total_rows,
+            successful_rows=successful_rows,
+            failed_rows=failed_rows,
+            processing_time=processing_time,
+            results_summary={
+                'success_rate': round((successful_rows / total_rows) * 100, 2) if total_rows else 0,
+                'avg_processing_time_per_row': round(processing_time / total_rows, 4) if total_rows else 0
+            },
+            ip_address=request.remote_addr
+        )
+        db.session.add(batch_record)
+        record_batch(processing_time, total_rows)
+        if results:
+            db.session.flush()
+            store_batch_results(batch_record.id, results)
+        db.session.commit()
+        return batch_record.id
+    except Exception as db_error:
+        logging.error(f"Database error storing batch processing: {str(db_error)}")
+        db.session.rollback()
+        return None
+
+def start_stream_record(filename, model_type):
+    """Store a running batch processing record for a streamed batch; returns its id, or None on database errors"""
+    try:
+        batch_record = BatchProcessing(
+            filename=filename,
+            model_type=model_type,
+            status='running',
+            total_rows=0,
+            successful_rows=0,
+            failed_rows=0,
+            processing_time=0.0,
+            started_at=datetime.utcnow(),
+            ip_address=request.remote_addr
+        )
+        db.session.add(batch_record)
+        db.session.commit()
+        return batch_record.id
+    except Exception as db_error:
+        logging.error(f"Database error storing batch processing: {str(db_error)}")
+        db.session.rollback()
+        return None
+
+def store_stream_chunk(batch_id, results, chunk_failed):
+    """Store one chunk of a streamed batch's row results and add it to the batch's counts"""
+    if batch_id is None:
+        return
+    try:
+        batch_record = db.session.get(BatchProcessing, batch_id)
+        store_batch_results(batch_id, results)
+        batch_record.successful_rows += len(results) - chunk_failed
+        batch_record.failed_rows += chunk_failed
+        batch_record.processed_rows += len(results)
+        db.session.commit()
+    except Exception as db_error:
+        logging.error(f"Database error storing results of batch {batch_id}: {str(db_error)}")
+        db.session.rollback()
+
+def finish_stream_record(batch_id, processing_time, error=None):
+    """Mark a streamed batch completed (or failed) and add it to the running batch totals"""
+    if batch_id is None:
+        return
+    try:
+        batch_record = db.session.get(BatchProcessing, batch_id)
+        total_rows = batch_record.processed_rows
+        batch_record.total_rows = total_rows
+        batch_record.processing_time = processing_time
+        batch_record.results_summary = {
+            'success_rate': round((batch_record.successful_rows / total_rows) * 100, 2) if total_rows else 0,
+            'avg_processing_time_per_row': round(processing_time / total_rows, 4) if total_rows else 0
+        }
+        batch_record.status = 'failed' if error else 'completed'
+        batch_record.error_message = error
+        batch_record.completed_at = datetime.utcnow()
+        record_batch(processing_time, total_rows)
+        db.session.commit()
+    except Exception as db_error:
+        logging.error(f"Database error finishing batch {batch_id}: {str(db_error)}")
+        db.session.rollback()
+
+@api_bp.route('/batch-process/<int:batch_id>/results', methods=['GET'])
+def get_batch_results(batch_id):
+    """API endpoint to page through the stored row results of a batch
+    
+    Rows come in row order; status=successful or status=failed keeps only those rows.
+    """
+    try:
+        batch = db.session.get(BatchProcessing, batch_id)
+        if batch is None:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 100, type=int), MAX_RESULTS_PER_PAGE)
+        status = request.args.get('status')
+        
+        query = BatchResult.query.filter(BatchResult.batch_id == batch_id)
+        if status == 'successful':
+            query = query.filter(BatchResult.successful.is_(True))
+        elif status == 'failed':
+            query = query.filter(BatchResult.successful.is_(False))
+        elif status is not None:
+            return jsonify({'error': f'Unknown status: {status} (expected successful or failed)'}), 400
+        
+        results = query.order_by(BatchResult.row_index).paginate(page=page, per_page=per_page, error_out=False)
+        
+        return jsonify({
+            'batch': batch.to_dict(),
+            'results': [result.to_dict() for result in results.items],
+            'total': results.total,
+            'page': results.page,
+            'pages': results.pages,
+            'per_page': results.per_page,
+            'has_next': results.has_next,
+            'has_prev': results.has_prev
+        })
+        
+    except Exception as e:
+        logging.error(f"Batch results API error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/batch-jobs', methods=['POST'])
+def submit_batch_job():
+    """API endpoint to queue a CSV file for background batch processing"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not file.filename.endswith('.csv'):
+            return jsonify({'error': 'File must be CSV format'}), 400
+        
+        model_type = request.form.get('model_type', 'packaging')
+        if model_type not in ml_manager.model_status:
+            return jsonify({'error': f'Unknown model type: {model_type}'}), 400
+        
+        app = current_app._get_current_object()
+        job = batch_jobs.submit(app, file, file.filename, model_type, request.remote_addr)
+        
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('api.get_batch_job', job_id=job.id),
+            'results_url': url_for('api.get_batch_job_results', job_id=job.id)
+        }), 202
+        
+    except Exception as e:
+        logging.error(f"Batch job submission API error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/batch-jobs/<int:job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """API endpoint to get the status and progress of a batch job"""
+    job = db.session.get(BatchProcessing, job_id)
+    if job is None:
+        return jsonify({'error': 'Batch job not found'}), 404
+    return jsonify(job.to_dict())
+
+@api_bp.route('/batch-jobs/<int:job_id>/results', methods=['GET'])
+def get_batch_job_results(job_id):
+    """API endpoint to download the row results of a completed batch job as NDJSON
+    
+    An optional limit query parameter returns only the first rows.
+    """
+    job = db.session.get(BatchProcessing, job_id)
+    if job is None:
+        return jsonify({'error': 'Batch job not found'}), 404
+    
+    if job.status != 'completed':
+        return jsonify({'error': f'Batch job is {job.status}', 'status': job.status}), 409
+    
+    if not job.result_path or not os.path.exists(job.result_path):
+        return jsonify({'error': 'Batch job results are no longer available'}), 410
+    
+    limit = request.args.get('limit', type=int)
+    result_path = job.result_path
+    
+    def generate():
+        with open(result_path) as results:
+            for position, line in enumerate(results):
+                if limit is not None and position >= limit:
+                    break
+                yield line
+    
+    download_name = f"{os.path.splitext(job.filename)[0]}_results.ndjson"
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
 @api_bp.route('/models/status', methods=['GET'])
 def get_models_status():
     """API endpoint to get model training status"""
     try:
-        status = ml_manager.get_model_status()
-        return jsonify(status)
+        return jsonify({
+            'models': ml_manager.get_model_status(),
+            'cache': ml_manager.get_cache_stats()
+        })
         
     except Exception as e:
         logging.error(f"Model status API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/models/micro-batching', methods=['GET'])
+def get_micro_batching_stats():
+    """API endpoint to get micro-batching fill metrics"""
+    return jsonify(ml_manager.get_micro_batching_stats())
+
+@api_bp.route('/prediction-log', methods=['GET'])
+def get_prediction_log_stats():
+    """API endpoint to get prediction logging queue and flush metrics"""
+    return jsonify(prediction_logger.stats())
+
 @api_bp.route('/models/train', methods=['POST'])
 def train_models():
-    """API endpoint to trigger model training"""
+    """API endpoint to trigger background model training"""
     try:
         model_type = request.get_json().get('model_type', 'all')
         
         if model_type == 'all':
-            ml_manager.train_all_models()
+            model_types = None
+        elif model_type in ml_manager.model_status:
+            model_types = [model_type]
         else:
-            ml_manager.train_model(model_type)
+            return jsonify({'error': f'Unknown model type: {model_type}'}), 400
+        
+        # Models keep serving while the job trains; record its timings once it finishes
+        app = current_app._get_current_object()
+        job = ml_manager.start_training(model_types, on_complete=lambda job: record_training_times(app, job))
         
         return jsonify({
             'message': f'Training initiated for {model_type} model(s)',
-            'status': 'training'
-        })
+            'status': job.status,
+            'job_id': job.id,
+            'status_url': url_for('api.get_training_job', job_id=job.id)
+        }), 202
         
     except Exception as e:
         logging.error(f"Model training API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/models/train/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """API endpoint to get the progress of a training job"""
+    job = ml_manager.get_training_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Training job not found'}), 404
+    return jsonify(job.to_dict())
+
+def record_training_times(app, job):
+    """Store the training times of a finished training job"""
+    with app.app_context():
+        try:
+            for model_type, result in job.results.items():
+                if result['status'] == 'ready':
+                    db.session.add(ModelPerformance(
+                        model_type=model_type,
+                        training_time=result['training_time'],
+                        version=result['version'],
+                        metrics={'n_samples': result['n_samples'], 'n_jobs': result['n_jobs'], 'job_id': job.id}
+                    ))
+            db.session.commit()
+        except Exception as db_error:
+            logging.error(f"Database error storing model performance: {str(db_error)}")
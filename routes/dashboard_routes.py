@@ -1,7 +1,11 @@
 from flask import Blueprint, jsonify, render_template, request
-from models.database import db, Prediction, BatchProcessing, ModelPerformance, UserSession, SystemStats
-from sqlalchemy import func, desc
+from models.database import Prediction, BatchProcessing, ModelPerformance, UserSession
+from utils.rollups import totals_by_model, daily_rollups_since, system_stats
+from sqlalchemy import desc, func, tuple_
 from datetime import datetime, timedelta
+import base64
+import binascii
+import json
 import logging
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -13,18 +17,16 @@ def analytics_dashboard():
         # Get recent predictions
         recent_predictions = Prediction.query.order_by(desc(Prediction.created_at)).limit(10).all()
         
-        # Get model usage statistics
-        model_usage = db.session.query(
-            Prediction.model_type,
-            func.count(Prediction.id).label('count')
-        ).group_by(Prediction.model_type).all()
+        # Get model usage statistics from the rollups
+        model_usage = [(totals['model_type'], totals['count']) for totals in totals_by_model()]
         
-        # Get batch processing stats
-        batch_stats = db.session.query(
-            func.count(BatchProcessing.id).label('total_batches'),
-            func.sum(BatchProcessing.total_rows).label('total_rows'),
-            func.avg(BatchProcessing.processing_time).label('avg_time')
-        ).first()
+        # Get batch processing stats from the running totals
+        totals = system_stats()
+        batch_stats = {
+            'total_batches': totals.total_batch_jobs,
+            'total_rows': totals.total_batch_rows,
+            'avg_time': totals.avg_processing_time
+        }
         
         return render_template('analytics_dashboard.html', 
                              recent_predictions=recent_predictions,
@@ -41,26 +43,14 @@ def analytics_dashboard():
 def get_dashboard_stats():
     """API endpoint for dashboard statistics"""
     try:
-        # Total predictions by model
-        predictions_by_model = db.session.query(
-            Prediction.model_type,
-            func.count(Prediction.id).label('count')
-        ).group_by(Prediction.model_type).all()
+        # Totals by model and daily counts come from the rollups, not the predictions table
+        predictions_by_model = totals_by_model()
         
         # Daily predictions for the last 7 days
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        daily_predictions = db.session.query(
-            func.date(Prediction.created_at).label('date'),
-            func.count(Prediction.id).label('count')
-        ).filter(Prediction.created_at >= seven_days_ago)\
-         .group_by(func.date(Prediction.created_at))\
-         .order_by(func.date(Prediction.created_at)).all()
-        
-        # Average processing times by model
-        processing_times = db.session.query(
-            Prediction.model_type,
-            func.avg(Prediction.processing_time).label('avg_time')
-        ).group_by(Prediction.model_type).all()
+        daily_counts = {}
+        for (date, _), totals in daily_rollups_since(seven_days_ago).items():
+            daily_counts[date] = daily_counts.get(date, 0) + totals[0]
         
         # Recent batch jobs
         recent_batches = BatchProcessing.query.order_by(desc(BatchProcessing.created_at)).limit(5).all()
@@ -69,13 +59,13 @@ def get_dashboard_stats():
         model_performance = ModelPerformance.query.all()
         
         stats = {
-            'predictions_by_model': [{'model': p.model_type, 'count': p.count} for p in predictions_by_model],
-            'daily_predictions': [{'date': str(d.date), 'count': d.count} for d in daily_predictions],
-            'processing_times': [{'model': p.model_type, 'avg_time': round(p.avg_time or 0, 3)} for p in processing_times],
+            'predictions_by_model': [{'model': p['model_type'], 'count': p['count']} for p in predictions_by_model],
+            'daily_predictions': [{'date': str(date), 'count': count} for date, count in sorted(daily_counts.items())],
+            'processing_times': [{'model': p['model_type'], 'avg_time': round(p['avg_processing_time'] or 0, 3)} for p in predictions_by_model],
             'recent_batches': [batch.to_dict() for batch in recent_batches],
             'model_performance': [perf.to_dict() for perf in model_performance],
-            'total_predictions': sum(p.count for p in predictions_by_model),
-            'total_batch_jobs': BatchProcessing.query.count(),
+            'total_predictions': sum(p['count'] for p in predictions_by_model),
+            'total_batch_jobs': system_stats().total_batch_jobs,
             'active_sessions': UserSession.query.filter(
                 UserSession.last_activity >= datetime.utcnow() - timedelta(hours=1)
             ).count()
@@ -89,7 +79,13 @@ def get_dashboard_stats():
 
 @dashboard_bp.route('/api/predictions/recent')
 def get_recent_predictions():
-    """Get recent predictions with pagination"""
+    """Get recent predictions with pagination
+    
+    Passing cursor (empty for the first page, then each response's next_cursor) pages
+    by keyset on (created_at, id) instead of OFFSET, so every page costs the same; the
+    total then comes from the rollups unless include_total=true asks for an exact count.
+    Without cursor, page/per_page pagination works as before.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
@@ -100,6 +96,9 @@ def get_recent_predictions():
         if model_type:
             query = query.filter(Prediction.model_type == model_type)
         
+        if 'cursor' in request.args:
+            return get_recent_predictions_page(query, request.args['cursor'], per_page, model_type)
+        
         predictions = query.order_by(desc(Prediction.created_at))\
                           .paginate(page=page, per_page=per_page, error_out=False)
         
@@ -117,6 +116,55 @@ def get_recent_predictions():
         logging.error(f"Recent predictions API error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def encode_cursor(prediction):
+    """Opaque cursor pointing after a prediction in newest-first order"""
+    key = json.dumps([prediction.created_at.isoformat(), prediction.id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor):
+    """(created_at, id) of a cursor from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, prediction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_recent_predictions_page(query, cursor, per_page, model_type):
+    """One keyset page of predictions, newest first, read from ix_predictions_*created_at_id"""
+    per_page = max(per_page, 1)
+    # Rows without a timestamp have no place in the keyset order (nor in the rollups)
+    query = query.filter(Prediction.created_at.is_not(None))
+    page_query = query
+    
+    if cursor:
+        try:
+            created_at, prediction_id = decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        page_query = query.filter(tuple_(Prediction.created_at, Prediction.id) < (created_at, prediction_id))
+    
+    # One extra row tells whether there is a next page
+    predictions = page_query.order_by(desc(Prediction.created_at), desc(Prediction.id)).limit(per_page + 1).all()
+    has_next = len(predictions) > per_page
+    predictions = predictions[:per_page]
+    
+    if request.args.get('include_total', 'false').lower() == 'true':
+        total_source = 'count'
+        total = query.with_entities(func.count(Prediction.id)).scalar()
+    else:
+        total_source = 'rollups'
+        total = sum(totals['count'] for totals in totals_by_model()
+                    if not model_type or totals['model_type'] == model_type)
+    
+    return jsonify({
+        'predictions': [pred.to_dict() for pred in predictions],
+        'total': total,
+        'total_source': total_source,
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(predictions[-1]) if has_next else None
+    })
+
 @dashboard_bp.route('/api/performance/trends')
 def get_performance_trends():
     """Get model performance trends over time"""
@@ -124,41 +172,25 @@ def get_performance_trends():
         # Performance trends for the last 30 days
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
-        # Average confidence scores by day
-        confidence_trends = db.session.query(
-            func.date(Prediction.created_at).label('date'),
-            Prediction.model_type,
-            func.avg(Prediction.confidence_score).label('avg_confidence')
-        ).filter(Prediction.created_at >= thirty_days_ago)\
-         .filter(Prediction.confidence_score.is_not(None))\
-         .group_by(func.date(Prediction.created_at), Prediction.model_type)\
-         .order_by(func.date(Prediction.created_at)).all()
-        
-        # Processing time trends
-        processing_trends = db.session.query(
-            func.date(Prediction.created_at).label('date'),
-            Prediction.model_type,
-            func.avg(Prediction.processing_time).label('avg_processing_time')
-        ).filter(Prediction.created_at >= thirty_days_ago)\
-         .group_by(func.date(Prediction.created_at), Prediction.model_type)\
-         .order_by(func.date(Prediction.created_at)).all()
+        # Daily averages from the hourly rollups
+        days = sorted(daily_rollups_since(thirty_days_ago).items(), key=lambda item: (item[0][0], item[0][1]))
         
         trends = {
             'confidence_trends': [
                 {
-                    'date': str(t.date),
-                    'model_type': t.model_type,
-                    'avg_confidence': round(t.avg_confidence or 0, 3)
+                    'date': str(date),
+                    'model_type': model_type,
+                    'avg_confidence': round(totals[3] / totals[4], 3)
                 }
-                for t in confidence_trends
+                for (date, model_type), totals in days if totals[4]
             ],
             'processing_trends': [
                 {
-                    'date': str(t.date),
-                    'model_type': t.model_type,
-                    'avg_processing_time': round(t.avg_processing_time or 0, 3)
+                    'date': str(date),
+                    'model_type': model_type,
+                    'avg_processing_time': round(totals[1] / totals[2] if totals[2] else 0, 3)
                 }
-                for t in processing_trends
+                for (date, model_type), totals in days
             ]
         }
         
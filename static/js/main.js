@@ -2,10 +2,10 @@
 
 // Global variables
 let modelStatus = {
-    packaging: 'not_trained',
-    carbon_footprint: 'not_trained',
-    product_recommendation: 'not_trained',
-    esg_score: 'not_trained'
+    packaging: 'not_loaded',
+    carbon_footprint: 'not_loaded',
+    product_recommendation: 'not_loaded',
+    esg_score: 'not_loaded'
 };
 
 // Initialize application when DOM is loaded
@@ -363,8 +363,8 @@ async function checkModelsStatus() {
         const response = await fetch('/api/models/status');
         const status = await response.json();
         
-        modelStatus = status;
-        updateModelStatusUI(status);
+        modelStatus = status.models;
+        updateModelStatusUI(status.models);
         
     } catch (error) {
         console.error('Error checking model status:', error);
@@ -0,0 +1,114 @@
+import logging
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from models.database import db, BatchProcessing
+from utils.batch_results import store_batch_results, dumps_result
+from utils.rollups import record_batch
+
+
+def count_data_rows(path):
+    """Estimate the data rows of a CSV file from its line count, without parsing it"""
+    lines = 0
+    last = b''
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last and last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+class BatchJobQueue:
+    """Runs CSV batch jobs on background threads, tracking their progress in BatchProcessing.
+
+    Uploads are saved under job_dir and processed chunk by chunk with
+    DataProcessor.process_batch_chunks; row results are written to an NDJSON file next
+    to them and to batch_results, and committed with the job's row counts after every
+    chunk, so any worker can report progress and page through results from the database.
+    """
+
+    def __init__(self, data_processor, job_dir=None, max_workers=None):
+        self.data_processor = data_processor
+        self.job_dir = job_dir or os.environ.get('BATCH_JOB_DIR', os.path.join(tempfile.gettempdir(), 'batch_jobs'))
+        self.max_workers = max_workers or int(os.environ.get('BATCH_JOB_WORKERS', 2))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch-job')
+
+    def submit(self, app, file, filename, model_type, ip_address=None):
+        """Save an uploaded CSV, record a queued job for it and start processing it"""
+        os.makedirs(self.job_dir, exist_ok=True)
+        upload_path = os.path.join(self.job_dir, f"{uuid.uuid4().hex}.csv")
+        file.save(upload_path)
+
+        job = BatchProcessing(
+            filename=filename,
+            model_type=model_type,
+            status='queued',
+            total_rows=count_data_rows(upload_path),
+            successful_rows=0,
+            failed_rows=0,
+            processing_time=0.0,
+            ip_address=ip_address
+        )
+        db.session.add(job)
+        record_batch()
+        db.session.commit()
+
+        self._executor.submit(self._run, app, job.id, upload_path)
+        return job
+
+    def _run(self, app, job_id, upload_path):
+        with app.app_context():
+            job = db.session.get(BatchProcessing, job_id)
+            start_time = time.time()
+            result_path = os.path.join(self.job_dir, f"{job_id}.results.ndjson")
+
+            try:
+                job.status = 'running'
+                job.started_at = datetime.utcnow()
+                job.result_path = result_path
+                db.session.commit()
+
+                with open(result_path, 'w') as out:
+                    for results in self.data_processor.process_batch_chunks(upload_path, job.model_type):
+                        out.writelines(dumps_result(result) + '\n' for result in results)
+                        out.flush()
+
+                        store_batch_results(job_id, results)
+                        chunk_failed = sum(1 for r in results if 'error' in r)
+                        job.successful_rows += len(results) - chunk_failed
+                        job.failed_rows += chunk_failed
+                        job.processed_rows += len(results)
+                        job.processing_time = time.time() - start_time
+                        db.session.commit()
+
+                total_rows = job.processed_rows
+                job.total_rows = total_rows
+                job.processing_time = time.time() - start_time
+                job.results_summary = {
+                    'success_rate': round((job.successful_rows / total_rows) * 100, 2) if total_rows else 0,
+                    'avg_processing_time_per_row': round(job.processing_time / total_rows, 4) if total_rows else 0
+                }
+                job.status = 'completed'
+            except Exception as e:
+                logging.error(f"Batch job {job_id} error: {str(e)}")
+                db.session.rollback()
+                job = db.session.get(BatchProcessing, job_id)
+                job.status = 'failed'
+                job.error_message = str(e)
+                job.processing_time = time.time() - start_time
+            finally:
+                try:
+                    job.completed_at = datetime.utcnow()
+                    record_batch(job.processing_time, job.total_rows, new_batch=False)
+                    db.session.commit()
+                except Exception as db_error:
+                    logging.error(f"Database error finishing batch job {job_id}: {str(db_error)}")
+                    db.session.rollback()
+                if os.path.exists(upload_path):
+                    os.remove(upload_path)
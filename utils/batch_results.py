@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import math
+
+from models.database import db, BatchResult
+
+# Rows written per COPY or executemany statement
+WRITE_CHUNK_ROWS = 10000
+
+
+def _json_safe(value):
+    """value with NaN and infinite floats replaced by None, which JSON columns cannot hold"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def dumps_result(result):
+    """JSON text of a row result, with non-finite floats as null
+
+    Use it wherever row results are written out: plain json.dumps writes NaN
+    tokens, which are not valid JSON.
+    """
+    try:
+        return json.dumps(result, allow_nan=False)
+    except ValueError:
+        # Missing CSV values come through as NaN in input_data
+        return json.dumps(_json_safe(result))
+
+
+def store_batch_results(batch_id, results):
+    """Store the row results of a batch in batch_results, in the current transaction
+
+    PostgreSQL (through psycopg2) gets one COPY per chunk of rows; other databases
+    one executemany INSERT per chunk. The caller commits. Returns the number of rows written.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        write = _copy_rows
+    else:
+        write = _insert_rows
+
+    for start in range(0, len(results), WRITE_CHUNK_ROWS):
+        write(connection, batch_id, results[start:start + WRITE_CHUNK_ROWS])
+    return len(results)
+
+
+def _insert_rows(connection, batch_id, results):
+    """Write row results with one executemany INSERT, serialized by the JSON column type"""
+    connection.execute(BatchResult.__table__.insert(), [
+        {
+            'batch_id': batch_id,
+            'row_index': result['row_index'],
+            'successful': 'error' not in result,
+            'result': _json_safe(result)
+        }
+        for result in results
+    ])
+
+
+def _copy_rows(connection, batch_id, results):
+    """Write row results with COPY ... FROM STDIN on the session's psycopg2 connection"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for result in results:
+        writer.writerow((batch_id, result['row_index'], 'error' not in result, dumps_result(result)))
+    buffer.seek(0)
+
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            'COPY batch_results (batch_id, row_index, successful, result) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+    finally:
+        cursor.close()
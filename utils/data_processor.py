@@ -1,37 +1,234 @@
 import pandas as pd
 import numpy as np
-from models.ml_models import MLModelManager
+from models.ml_models import MLModelManager, TRAINING_CONFIG, ESG_DEFAULTS, ESG_FEATURES
 import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor
+
+# Input fields every row needs, per model type
+REQUIRED_COLUMNS = {
+    'packaging': ['product_weight', 'fragility', 'material_type', 'transport_mode'],
+    'carbon_footprint': ['age', 'income', 'location', 'transport_preference'],
+    'product_recommendation': ['category', 'budget'],
+    'esg_score': ['carbon_emissions', 'renewable_energy', 'waste_management']
+}
+
+# Values the single-item predictions use for optional fields an input leaves out
+ITEM_DEFAULTS = {
+    'product_recommendation': {'eco_priority': True},
+    'esg_score': ESG_DEFAULTS
+}
+
+# DataProcessor of a batch worker process, created by _init_shard_worker
+_shard_processor = None
+
+def _init_shard_worker(artifact_dir, compiled_inference, model_types):
+    """Set up a batch worker process with models preloaded from the artifact store"""
+    global _shard_processor
+    os.environ['MODEL_ARTIFACT_DIR'] = artifact_dir
+    os.environ['MODEL_COMPILED_INFERENCE'] = 'true' if compiled_inference else 'false'
+    os.environ['MODEL_EAGER_WARMUP'] = 'false'
+    _shard_processor = DataProcessor()
+    _shard_processor.ml_manager.warmup(model_types)
+
+def _process_shard(df, model_type):
+    """Predict one shard of a batch in a worker process"""
+    return _shard_processor._predict_batch(df, model_type)
+
+def _convert_column(series, caster):
+    """Cast every value of a column with caster, as float(), int() or str() would per value
+    
+    Returns the converted values and an object array of error messages (None where the
+    value converted). Numeric columns are converted in one pass; other columns fall back
+    to casting each value so error messages match the single-row path.
+    """
+    errors = np.full(len(series), None, dtype=object)
+    
+    if caster is str:
+        # Series.astype(str) keeps missing values as NaN, whereas str() gives 'nan'
+        values = np.empty(len(series), dtype=object)
+        values[:] = [str(value) for value in series.tolist()]
+        return values, errors
+    
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return series.to_numpy(dtype=np.int64 if caster is int else np.float64), errors
+    
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype=np.float64)
+        if caster is float:
+            return values, errors
+        
+        if np.any(np.abs(values[np.isfinite(values)]) >= 2 ** 63):
+            # Beyond int64 only Python ints hold the exact value
+            return _convert_values(series, caster)
+        
+        # int() truncates towards zero and rejects NaN and infinity
+        errors[np.isnan(values)] = 'cannot convert float NaN to integer'
+        errors[np.isinf(values)] = 'cannot convert float infinity to integer'
+        converted = np.zeros(len(values), dtype=np.int64)
+        finite = np.isfinite(values)
+        converted[finite] = np.trunc(values[finite])
+        return converted, errors
+    
+    return _convert_values(series, caster)
+
+def _convert_values(series, caster):
+    """Cast each value of a column with caster, recording the error message of failed casts"""
+    values = np.empty(len(series), dtype=object)
+    errors = np.full(len(series), None, dtype=object)
+    for position, value in enumerate(series.tolist()):
+        try:
+            values[position] = caster(value)
+        except Exception as e:
+            values[position] = caster(0)
+            errors[position] = str(e)
+    return values, errors
 
 class DataProcessor:
     def __init__(self):
         self.ml_manager = MLModelManager()
+        # Rows read, predicted and streamed back at a time by process_batch_chunks
+        self.stream_chunk_rows = int(os.environ.get('BATCH_STREAM_CHUNK_ROWS', 5000))
+        # Batches of at least parallel_min_rows rows are split into one shard per worker
+        # process; smaller ones, and all batches on a single worker, stay in-process
+        self.batch_workers = int(os.environ.get('BATCH_WORKERS', 0)) or os.cpu_count() or 1
+        self.parallel_min_rows = int(os.environ.get('BATCH_PARALLEL_MIN_ROWS', 50000))
+        self._pool = None
+        self._pool_lock = threading.Lock()
     
     def process_batch(self, df, model_type):
         """Process batch data for predictions"""
         try:
-            results = []
-            
-            if model_type == 'packaging':
-                results = self._process_packaging_batch(df)
-            elif model_type == 'carbon_footprint':
-                results = self._process_carbon_batch(df)
-            elif model_type == 'product_recommendation':
-                results = self._process_product_batch(df)
-            elif model_type == 'esg_score':
-                results = self._process_esg_batch(df)
-            else:
-                raise ValueError(f"Unknown model type: {model_type}")
-            
-            return results
+            if self._should_shard(df, model_type):
+                return self._process_sharded(df, model_type)
+            return self._predict_batch(df, model_type)
             
         except Exception as e:
             logging.error(f"Batch processing error: {str(e)}")
             return []
     
+    def _predict_batch(self, df, model_type):
+        """Predict a batch in this process, raising on invalid input"""
+        if model_type == 'packaging':
+            return self._process_packaging_batch(df)
+        elif model_type == 'carbon_footprint':
+            return self._process_carbon_batch(df)
+        elif model_type == 'product_recommendation':
+            return self._process_product_batch(df)
+        elif model_type == 'esg_score':
+            return self._process_esg_batch(df)
+        else:
+            raise ValueError(f"Unknown model type: {model_type}")
+    
+    def _should_shard(self, df, model_type):
+        """Whether a batch is worth fanning out to the worker processes
+        
+        Workers load models from the artifact store and never train, so families
+        without saved artifacts are processed in-process.
+        """
+        if self.batch_workers <= 1 or len(df) < self.parallel_min_rows or model_type not in TRAINING_CONFIG:
+            return False
+        return self.ml_manager.artifact_store.exists(model_type, TRAINING_CONFIG[model_type])
+    
+    def _get_pool(self, model_type):
+        """Worker process pool, started on first use with model_type preloaded"""
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the server's threads or locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.batch_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_shard_worker,
+                    initargs=(self.ml_manager.artifact_store.root_dir, self.ml_manager.compiled_inference, [model_type])
+                )
+            return self._pool
+    
+    def _reset_pool(self):
+        """Shut down a failed worker pool so the next large batch starts a new one"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _process_sharded(self, df, model_type):
+        """Split a batch into one contiguous shard per worker and merge the results in row order"""
+        pool = self._get_pool(model_type)
+        bounds = np.linspace(0, len(df), self.batch_workers + 1).astype(int)
+        shards = [df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        
+        results = []
+        try:
+            # map returns shard results in submission order, so rows stay in order
+            for shard_results in pool.map(_process_shard, shards, [model_type] * len(shards)):
+                results.extend(shard_results)
+        except BrokenExecutor as e:
+            logging.error(f"Batch worker pool failed, processing in-process: {str(e)}")
+            self._reset_pool()
+            return self._predict_batch(df, model_type)
+        return results
+    
+    def process_items(self, items, model_type):
+        """Process a list of JSON input objects through the batch path
+        
+        Returns one result per item, in order, with row_index set to the item's
+        position. Items that are not objects or lack a required field get an error
+        result and are left out of the batch; input_data is the item as given.
+        Optional fields are defaulted per item, so an item that leaves one out is
+        predicted as it would be alone, whatever the other items hold.
+        """
+        if model_type not in REQUIRED_COLUMNS:
+            raise ValueError(f"Unknown model type: {model_type}")
+        
+        results = [None] * len(items)
+        positions = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[position] = {'row_index': position, 'error': 'Item must be a JSON object'}
+                continue
+            
+            missing_fields = [field for field in REQUIRED_COLUMNS[model_type] if item.get(field) is None]
+            if missing_fields:
+                results[position] = {'row_index': position, 'error': f"Missing required fields: {missing_fields}"}
+            else:
+                positions.append(position)
+        
+        if positions:
+            defaults = ITEM_DEFAULTS.get(model_type, {})
+            df = pd.DataFrame([{**defaults, **items[position]} for position in positions], index=positions)
+            for result in self.process_batch(df, model_type):
+                results[result['row_index']] = result
+        
+        for position, result in enumerate(results):
+            if result is None:
+                result = {'row_index': position, 'error': 'Prediction failed'}
+                results[position] = result
+            if 'error' in result:
+                result['input_data'] = items[position]
+        
+        return results
+    
+    def process_batch_chunks(self, csv_file, model_type, chunk_rows=None):
+        """Process a CSV file chunk by chunk, yielding the list of row results of each chunk
+        
+        Only one chunk of rows and its results are in memory at a time, whatever the
+        file size. Column types are inferred per chunk; row_index counts rows across
+        the whole file, as with process_batch on the full DataFrame. Floats are parsed
+        round-trip exact, as float() parses the values of mixed-type columns, so results
+        do not depend on how the file is chunked.
+        """
+        reader = pd.read_csv(csv_file, chunksize=chunk_rows or self.stream_chunk_rows, float_precision='round_trip')
+        for position, chunk in enumerate(reader):
+            if position == 0:
+                is_valid, message = self.validate_csv_format(chunk, model_type)
+                if not is_valid:
+                    raise ValueError(message)
+            
+            yield self.process_batch(chunk, model_type)
+    
     def _process_packaging_batch(self, df):
         """Process packaging batch data"""
-        results = []
         required_columns = ['product_weight', 'fragility', 'material_type', 'transport_mode']
         
         # Check if required columns exist
@@ -39,38 +236,30 @@ class DataProcessor:
         if missing_columns:
             raise ValueError(f"Missing columns: {missing_columns}")
         
-        for index, row in df.iterrows():
-            try:
-                data = {
-                    'product_weight': float(row['product_weight']),
-                    'fragility': str(row['fragility']),
-                    'material_type': str(row['material_type']),
-                    'transport_mode': str(row['transport_mode'])
-                }
-                
-                prediction = self.ml_manager.predict_packaging(data)
-                confidence = self.ml_manager.get_prediction_confidence('packaging', data)
-                
-                results.append({
-                    'row_index': index,
-                    'prediction': prediction,
-                    'confidence': confidence,
-                    'input_data': data
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing row {index}: {str(e)}")
-                results.append({
-                    'row_index': index,
-                    'error': str(e),
-                    'input_data': row.to_dict()
-                })
+        inputs, errors = self._convert_columns(df, {
+            'product_weight': (float, None),
+            'fragility': (str, None),
+            'material_type': (str, None),
+            'transport_mode': (str, None)
+        })
+        self._check_categories('packaging', inputs, errors)
+        valid = pd.isna(errors)
         
-        return results
+        predictions = self.ml_manager.predict_packaging_batch(inputs[valid])
+        confidences = self.ml_manager.get_prediction_confidences('packaging', len(predictions))
+        outputs = zip(predictions.tolist(), confidences.tolist())
+        
+        def make_result(data):
+            prediction, confidence = next(outputs)
+            return {
+                'prediction': prediction,
+                'confidence': confidence
+            }
+        
+        return self._build_results(df, inputs, errors, make_result)
     
     def _process_carbon_batch(self, df):
         """Process carbon footprint batch data"""
-        results = []
         required_columns = ['age', 'income', 'location', 'transport_preference']
         
         # Check if required columns exist
@@ -78,39 +267,33 @@ class DataProcessor:
         if missing_columns:
             raise ValueError(f"Missing columns: {missing_columns}")
         
-        for index, row in df.iterrows():
-            try:
-                data = {
-                    'age': int(row['age']),
-                    'income': float(row['income']),
-                    'location': str(row['location']),
-                    'transport_preference': str(row['transport_preference'])
-                }
-                
-                prediction = self.ml_manager.predict_carbon_footprint(data)
-                breakdown = self.ml_manager.get_carbon_breakdown(data)
-                
-                results.append({
-                    'row_index': index,
-                    'prediction': prediction,
-                    'breakdown': breakdown,
-                    'unit': 'tons CO2/year',
-                    'input_data': data
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing row {index}: {str(e)}")
-                results.append({
-                    'row_index': index,
-                    'error': str(e),
-                    'input_data': row.to_dict()
-                })
+        inputs, errors = self._convert_columns(df, {
+            'age': (int, None),
+            'income': (float, None),
+            'location': (str, None),
+            'transport_preference': (str, None)
+        })
+        self._check_categories('carbon_footprint', inputs, errors)
+        valid = pd.isna(errors)
         
-        return results
+        predictions, breakdowns = self.ml_manager.predict_carbon_footprint_with_breakdown_batch(inputs[valid])
+        outputs = zip(predictions, breakdowns)
+        
+        def make_result(data):
+            prediction, breakdown = next(outputs)
+            return {
+                'prediction': prediction,
+                'breakdown': breakdown,
+                'unit': 'tons CO2/year'
+            }
+        
+        return self._build_results(df, inputs, errors, make_result)
     
     def _process_product_batch(self, df):
-        """Process product recommendation batch data"""
-        results = []
+        """Process product recommendation batch data
+        
+        Rows asking the same (category, budget, eco_priority) query share one answer.
+        """
         required_columns = ['category', 'budget']
         
         # Check if required columns exist
@@ -118,36 +301,29 @@ class DataProcessor:
         if missing_columns:
             raise ValueError(f"Missing columns: {missing_columns}")
         
-        for index, row in df.iterrows():
-            try:
-                data = {
-                    'category': str(row['category']),
-                    'budget': float(row['budget']),
-                    'eco_priority': row.get('eco_priority', True)
-                }
-                
-                recommendations = self.ml_manager.predict_product_recommendations(data)
-                
-                results.append({
-                    'row_index': index,
-                    'recommendations': recommendations,
-                    'count': len(recommendations),
-                    'input_data': data
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing row {index}: {str(e)}")
-                results.append({
-                    'row_index': index,
-                    'error': str(e),
-                    'input_data': row.to_dict()
-                })
+        inputs, errors = self._convert_columns(df, {
+            'category': (str, None),
+            'budget': (float, None)
+        })
+        # eco_priority is passed through as given, and only its truthiness is used
+        eco_priority = np.empty(len(df), dtype=object)
+        eco_priority[:] = df['eco_priority'].tolist() if 'eco_priority' in df.columns else [True] * len(df)
+        inputs['eco_priority'] = eco_priority
+        valid = pd.isna(errors)
         
-        return results
+        recommendations = iter(self.ml_manager.predict_product_recommendations_batch(inputs[valid]))
+        
+        def make_result(data):
+            product_recommendations = next(recommendations)
+            return {
+                'recommendations': product_recommendations,
+                'count': len(product_recommendations)
+            }
+        
+        return self._build_results(df, inputs, errors, make_result)
     
     def _process_esg_batch(self, df):
         """Process ESG score batch data"""
-        results = []
         required_columns = ['carbon_emissions', 'renewable_energy', 'waste_management']
         
         # Check if required columns exist
@@ -155,51 +331,81 @@ class DataProcessor:
         if missing_columns:
             raise ValueError(f"Missing columns: {missing_columns}")
         
-        for index, row in df.iterrows():
-            try:
-                data = {
-                    'carbon_emissions': float(row['carbon_emissions']),
-                    'renewable_energy': float(row['renewable_energy']),
-                    'waste_management': float(row['waste_management']),
-                    'employee_satisfaction': float(row.get('employee_satisfaction', 7)),
-                    'diversity_score': float(row.get('diversity_score', 6)),
-                    'community_impact': float(row.get('community_impact', 6)),
-                    'board_independence': float(row.get('board_independence', 60)),
-                    'transparency_score': float(row.get('transparency_score', 7)),
-                    'ethics_score': float(row.get('ethics_score', 7))
-                }
-                
-                esg_scores = self.ml_manager.predict_esg_score(data)
-                
-                results.append({
-                    'row_index': index,
-                    'esg_scores': esg_scores,
-                    'input_data': data
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing row {index}: {str(e)}")
+        inputs, errors = self._convert_columns(df, {
+            field: (float, None if field in required_columns else ESG_DEFAULTS[field])
+            for field in ESG_FEATURES
+        })
+        valid = pd.isna(errors)
+        
+        esg_scores = iter(self.ml_manager.predict_esg_score_batch(inputs[valid]))
+        return self._build_results(df, inputs, errors, lambda data: {'esg_scores': next(esg_scores)})
+    
+    def _convert_columns(self, df, columns):
+        """Convert input columns with the same semantics as casting each row's values
+        
+        columns maps each field to (caster, default), where the default is used when the
+        column is absent. Returns a DataFrame of converted values and an object array
+        holding the first conversion error of each row (None for valid rows).
+        """
+        n_rows = len(df)
+        inputs = {}
+        errors = np.full(n_rows, None, dtype=object)
+        
+        for field, (caster, default) in columns.items():
+            if field in df.columns:
+                values, column_errors = _convert_column(df[field], caster)
+            else:
+                values = np.full(n_rows, caster(default), dtype=object)
+                column_errors = np.full(n_rows, None, dtype=object)
+            
+            # Keep only the first error per row, as the per-row conversion stops there
+            first_error = pd.isna(errors) & pd.notna(column_errors)
+            errors[first_error] = column_errors[first_error]
+            inputs[field] = values
+        
+        return pd.DataFrame(inputs, index=df.index), errors
+    
+    def _check_categories(self, model_type, inputs, errors):
+        """Record an unseen-category error for rows that converted without error"""
+        category_errors = self.ml_manager.category_errors(model_type, inputs)
+        first_error = pd.isna(errors) & pd.notna(category_errors)
+        errors[first_error] = category_errors[first_error]
+    
+    def _build_results(self, df, inputs, errors, make_result):
+        """Assemble per-row results in row order from converted inputs and model outputs
+        
+        make_result is called once per valid row, in order, with the row's input data.
+        """
+        results = []
+        failed = pd.notna(errors)
+        records = inputs.to_dict('records')
+        
+        for position, index in enumerate(df.index.tolist()):
+            if failed[position]:
                 results.append({
                     'row_index': index,
-                    'error': str(e),
-                    'input_data': row.to_dict()
+                    'error': errors[position],
+                    'input_data': df.iloc[position].to_dict()
                 })
+                continue
+            
+            data = records[position]
+            result = {'row_index': index}
+            result.update(make_result(data))
+            result['input_data'] = data
+            results.append(result)
+        
+        if failed.any():
+            logging.error(f"{int(failed.sum())} of {len(df)} rows failed validation, first error: {errors[failed][0]}")
         
         return results
     
     def validate_csv_format(self, df, model_type):
         """Validate CSV format for specific model type"""
-        required_columns = {
-            'packaging': ['product_weight', 'fragility', 'material_type', 'transport_mode'],
-            'carbon_footprint': ['age', 'income', 'location', 'transport_preference'],
-            'product_recommendation': ['category', 'budget'],
-            'esg_score': ['carbon_emissions', 'renewable_energy', 'waste_management']
-        }
-        
-        if model_type not in required_columns:
+        if model_type not in REQUIRED_COLUMNS:
             return False, f"Unknown model type: {model_type}"
         
-        missing_columns = [col for col in required_columns[model_type] if col not in df.columns]
+        missing_columns = [col for col in REQUIRED_COLUMNS[model_type] if col not in df.columns]
         if missing_columns:
             return False, f"Missing required columns: {missing_columns}"
         
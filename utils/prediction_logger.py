@@ -0,0 +1,250 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import DBAPIError
+
+from models.database import db, Prediction
+from utils.rollups import record_predictions
+
+OVERFLOW_POLICIES = ('drop', 'block', 'sample')
+
+# Tells the writer thread to flush what it has and stop
+_STOP = object()
+
+# Attempts of a flush that hits a deadlock or serialization failure, and the first backoff
+WRITE_ATTEMPTS = 4
+RETRY_DELAY = 0.05
+
+# PostgreSQL SQLSTATEs of transactions that can simply be run again
+RETRYABLE_SQLSTATES = ('40001', '40P01')
+
+
+def _is_retryable(error):
+    """Whether a database error is a deadlock, serialization failure or busy SQLite database"""
+    if not isinstance(error, DBAPIError):
+        return False
+    if getattr(error.orig, 'pgcode', None) in RETRYABLE_SQLSTATES:
+        return True
+    return 'database is locked' in str(error.orig)
+
+
+class PredictionLogger:
+    """Write-behind logger of Prediction rows.
+
+    log() puts a record on a bounded in-memory queue and returns; a writer thread
+    inserts queued records with one bulk_insert_mappings per flush, once batch_size
+    records are waiting or flush_interval seconds after the first one arrived. When
+    the queue is full, the overflow policy decides: 'drop' discards the record,
+    'block' waits up to block_timeout seconds for room before dropping it, and
+    'sample' starts keeping only a sample_rate fraction of records once the queue
+    is half full. Pending records are flushed at interpreter exit.
+
+    With asynchronous=False every log() call inserts its records before returning,
+    for hosts that freeze background threads between requests.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=1.0, overflow='drop',
+                 block_timeout=1.0, sample_rate=0.1, asynchronous=True):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow} (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        self.max_queue = max(int(max_queue), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = max(float(flush_interval), 0.0)
+        self.overflow = overflow
+        self.block_timeout = max(float(block_timeout), 0.0)
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        self.asynchronous = asynchronous
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._app = None
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._sampled_out = 0
+        self._failed = 0
+        self._retries = 0
+        self._flushes = 0
+        self._flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+        self._last_flush_seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Logger configured by the PREDICTION_LOG_* environment variables"""
+        return cls(
+            max_queue=int(os.environ.get('PREDICTION_LOG_QUEUE_SIZE', 10000)),
+            batch_size=int(os.environ.get('PREDICTION_LOG_BATCH_SIZE', 500)),
+            flush_interval=float(os.environ.get('PREDICTION_LOG_FLUSH_MS', 1000)) / 1000,
+            overflow=os.environ.get('PREDICTION_LOG_OVERFLOW', 'drop').lower(),
+            block_timeout=float(os.environ.get('PREDICTION_LOG_BLOCK_TIMEOUT_MS', 1000)) / 1000,
+            sample_rate=float(os.environ.get('PREDICTION_LOG_SAMPLE_RATE', 0.1)),
+            asynchronous=os.environ.get('PREDICTION_LOG_ASYNC', 'true').lower() != 'false'
+        )
+
+    def log(self, app, model_type, input_data, prediction_result, confidence_score=None,
+            processing_time=None, ip_address=None):
+        """Record one prediction"""
+        self.log_many(app, [{
+            'model_type': model_type,
+            'input_data': input_data,
+            'prediction_result': prediction_result,
+            'confidence_score': confidence_score,
+            'processing_time': processing_time,
+            'ip_address': ip_address
+        }])
+
+    def log_many(self, app, records):
+        """Record a list of Prediction mappings; returns how many were accepted"""
+        created_at = datetime.utcnow()
+        records = [{'created_at': created_at, **record} for record in records]
+        if not self.asynchronous:
+            with app.app_context():
+                self._write(records)
+            return len(records)
+
+        self._ensure_writer(app)
+        accepted = 0
+        for record in records:
+            if self._admit():
+                accepted += self._put(record)
+        return accepted
+
+    def _admit(self):
+        """Whether the sample policy keeps a record at the current queue depth"""
+        if self.overflow != 'sample' or self._queue.qsize() < self.max_queue // 2:
+            return True
+        if random.random() < self.sample_rate:
+            return True
+        with self._lock:
+            self._sampled_out += 1
+        return False
+
+    def _put(self, record):
+        try:
+            if self.overflow == 'block':
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return 0
+
+        with self._lock:
+            self._enqueued += 1
+        return 1
+
+    def close(self, timeout=5.0):
+        """Flush queued records and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.error("Prediction log queue is full, stopping without a final flush")
+            return
+        thread.join(timeout)
+
+    def stats(self):
+        """Queue depth, write counters and flush latency"""
+        with self._lock:
+            return {
+                'asynchronous': self.asynchronous,
+                'overflow_policy': self.overflow,
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'batch_size': self.batch_size,
+                'flush_interval_ms': round(self.flush_interval * 1000, 3),
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'dropped': self._dropped,
+                'sampled_out': self._sampled_out,
+                'failed': self._failed,
+                'retries': self._retries,
+                'flushes': self._flushes,
+                'avg_flush_ms': round(self._flush_seconds / self._flushes * 1000, 3) if self._flushes else 0.0,
+                'max_flush_ms': round(self._max_flush_seconds * 1000, 3),
+                'last_flush_ms': round(self._last_flush_seconds * 1000, 3)
+            }
+
+    def _ensure_writer(self, app):
+        # Threads do not survive a fork, so a forked server worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is None:
+                    atexit.register(self.close)
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pid = os.getpid()
+                self._app = app
+                self._thread = threading.Thread(target=self._run, name='prediction-logger', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = self._queue
+        stopping = False
+        while not stopping:
+            record = pending.get()
+            if record is _STOP:
+                break
+
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    record = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            with self._app.app_context():
+                self._write(batch)
+
+    def _write(self, records):
+        """Insert records in one statement batch with their rollups, recording flush metrics
+
+        A flush that deadlocks with another worker's is rolled back and run again
+        rather than dropped.
+        """
+        start_time = time.perf_counter()
+        written, failed, retries = 0, len(records), 0
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                db.session.bulk_insert_mappings(Prediction, records)
+                record_predictions(records)
+                db.session.commit()
+                written, failed = len(records), 0
+                break
+            except Exception as db_error:
+                db.session.rollback()
+                if attempt + 1 < WRITE_ATTEMPTS and _is_retryable(db_error):
+                    retries += 1
+                    time.sleep(RETRY_DELAY * 2 ** attempt * (1 + random.random()))
+                    continue
+                logging.error(f"Database error storing {len(records)} predictions: {str(db_error)}")
+                break
+        elapsed = time.perf_counter() - start_time
+
+        with self._lock:
+            self._written += written
+            self._failed += failed
+            self._retries += retries
+            self._flushes += 1
+            self._flush_seconds += elapsed
+            self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+            self._last_flush_seconds = elapsed
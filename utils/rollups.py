@@ -0,0 +1,261 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.database import db, Prediction, PredictionRollup, BatchProcessing, SystemStats
+
+ROLLUP_PERIODS = ('hour', 'day')
+
+# Rollup columns that accumulate, in the order of _rollup_values
+SUM_COLUMNS = ('prediction_count', 'processing_time_sum', 'processing_time_count', 'confidence_sum', 'confidence_count')
+
+# The single running-totals row of system_stats
+SYSTEM_STATS_ID = 1
+
+
+def bucket_start(timestamp, period):
+    """Start of the hour or day a timestamp falls in"""
+    if period == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _aggregate(rows, totals=None):
+    """Add (created_at, model_type, processing_time, confidence_score) rows to per-bucket totals"""
+    totals = totals if totals is not None else defaultdict(lambda: [0, 0.0, 0, 0.0, 0])
+    for created_at, model_type, processing_time, confidence_score in rows:
+        for period in ROLLUP_PERIODS:
+            bucket = totals[(period, bucket_start(created_at, period), model_type)]
+            bucket[0] += 1
+            if processing_time is not None:
+                bucket[1] += processing_time
+                bucket[2] += 1
+            if confidence_score is not None:
+                bucket[3] += confidence_score
+                bucket[4] += 1
+    return totals
+
+
+def _rollup_values(totals):
+    # In key order, so concurrent upserts lock the rows they share in the same order
+    return [
+        dict(zip(('period', 'bucket_start', 'model_type') + SUM_COLUMNS, key + tuple(values)))
+        for key, values in sorted(totals.items())
+    ]
+
+
+def record_predictions(records):
+    """Add Prediction mappings about to be inserted to the rollups, in the current transaction"""
+    if not records:
+        return
+
+    created_at = datetime.utcnow()
+    totals = _aggregate(
+        (record.get('created_at') or created_at, record['model_type'],
+         record.get('processing_time'), record.get('confidence_score'))
+        for record in records
+    )
+    _add_to_rollups(_rollup_values(totals))
+    _add_to_system_stats(total_predictions=len(records))
+
+
+def _upsert(table):
+    """INSERT ... ON CONFLICT statement of a table on PostgreSQL and SQLite, None elsewhere"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql_insert(table)
+    if dialect == 'sqlite':
+        return sqlite_insert(table)
+    return None
+
+
+def _add_to_rollups(values):
+    """Upsert rollup rows, adding to the totals of buckets that already exist"""
+    table = PredictionRollup.__table__
+    insert = _upsert(table)
+    if insert is not None:
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['period', 'bucket_start', 'model_type'],
+            set_={column: table.c[column] + insert.excluded[column] for column in SUM_COLUMNS}
+        ), values)
+        return
+
+    for value in values:
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.period == value['period'])
+            .where(table.c.bucket_start == value['bucket_start'])
+            .where(table.c.model_type == value['model_type'])
+            .values({column: table.c[column] + value[column] for column in SUM_COLUMNS})
+        )
+        if updated.rowcount == 0:
+            db.session.execute(table.insert(), [value])
+
+
+def _add_to_system_stats(total_predictions=0, total_batch_jobs=0, total_batch_rows=0, batch_processing_time=0.0):
+    """Add to the running totals row of system_stats, creating it on first use"""
+    table = SystemStats.__table__
+    increments = {
+        'total_predictions': total_predictions,
+        'total_batch_jobs': total_batch_jobs,
+        'total_batch_rows': total_batch_rows,
+        'batch_processing_time': batch_processing_time
+    }
+    first_row = dict(
+        increments,
+        id=SYSTEM_STATS_ID,
+        total_users=0,
+        avg_processing_time=batch_processing_time / total_batch_jobs if total_batch_jobs else 0.0,
+        updated_at=datetime.utcnow()
+    )
+    values = {column: func.coalesce(table.c[column], 0) + amount for column, amount in increments.items()}
+    jobs = func.coalesce(table.c.total_batch_jobs, 0) + total_batch_jobs
+    # Right-hand sides see the row before the update
+    values['avg_processing_time'] = (func.coalesce(table.c.batch_processing_time, 0) + batch_processing_time) / func.nullif(jobs, 0)
+    values['updated_at'] = first_row['updated_at']
+
+    # Workers starting on a fresh database all create the row at once
+    insert = _upsert(table)
+    if insert is not None:
+        db.session.execute(insert.values(first_row).on_conflict_do_update(index_elements=['id'], set_=values))
+        return
+
+    updated = db.session.execute(table.update().where(table.c.id == SYSTEM_STATS_ID).values(values))
+    if updated.rowcount == 0:
+        db.session.execute(table.insert(), [first_row])
+
+
+def record_batch(processing_time=0.0, total_rows=0, new_batch=True):
+    """Add a batch to the running batch totals, in the current transaction
+
+    Background jobs are counted when they are queued (new_batch=True, no rows yet)
+    and add their rows and time when they finish (new_batch=False).
+    """
+    _add_to_system_stats(
+        total_batch_jobs=1 if new_batch else 0,
+        total_batch_rows=total_rows or 0,
+        batch_processing_time=processing_time or 0.0
+    )
+
+
+def system_stats():
+    """The running totals row, or an empty one if nothing was recorded yet"""
+    return db.session.get(SystemStats, SYSTEM_STATS_ID) or SystemStats(
+        total_predictions=0, total_batch_jobs=0, total_batch_rows=0,
+        batch_processing_time=0.0, avg_processing_time=0.0
+    )
+
+
+def totals_by_model():
+    """All-time prediction totals of each model type, from the daily rollups"""
+    rows = db.session.query(
+        PredictionRollup.model_type,
+        func.sum(PredictionRollup.prediction_count),
+        func.sum(PredictionRollup.processing_time_sum),
+        func.sum(PredictionRollup.processing_time_count)
+    ).filter(PredictionRollup.period == 'day')\
+     .group_by(PredictionRollup.model_type)\
+     .order_by(PredictionRollup.model_type).all()
+
+    # SUM of an integer column is a Decimal on PostgreSQL
+    return [
+        {
+            'model_type': model_type,
+            'count': int(count or 0),
+            'avg_processing_time': float(time_sum) / int(time_count) if time_count else None
+        }
+        for model_type, count, time_sum, time_count in rows
+    ]
+
+
+def daily_rollups_since(since):
+    """Per-day, per-model totals of predictions made since a timestamp, from the hourly rollups
+
+    Returns {(date, model_type): [count, processing_time_sum, processing_time_count,
+    confidence_sum, confidence_count]}, with the window starting at the hour of since.
+    """
+    hours = PredictionRollup.query.filter(
+        PredictionRollup.period == 'hour',
+        PredictionRollup.bucket_start >= bucket_start(since, 'hour')
+    ).order_by(PredictionRollup.bucket_start).all()
+
+    days = {}
+    for hour in hours:
+        day = days.setdefault((hour.bucket_start.date(), hour.model_type), [0, 0.0, 0, 0.0, 0])
+        for position, column in enumerate(SUM_COLUMNS):
+            day[position] += getattr(hour, column)
+    return days
+
+
+def rebuild_rollups(chunk_rows=10000):
+    """Recompute the rollups and running totals from the predictions and batch_processing tables
+
+    Replaces whatever was recorded, so it is safe to run repeatedly: use it to
+    backfill a database that predates the rollups, or as a periodic compactor that
+    corrects any drift (`python -m utils.rollups`). Predictions are read in chunks
+    rather than aggregated in SQL, as bucketing dates differs between databases.
+
+    The rollup tables are locked before the predictions are read (LOCK TABLE on
+    PostgreSQL; on SQLite the first DELETE takes the database write lock), so
+    prediction log flushes wait for the rebuild instead of being lost from it. On
+    other databases run it only while nothing is writing predictions.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(db.text('LOCK TABLE prediction_rollups, system_stats IN EXCLUSIVE MODE'))
+    db.session.execute(PredictionRollup.__table__.delete())
+    db.session.execute(SystemStats.__table__.delete().where(SystemStats.id == SYSTEM_STATS_ID))
+
+    query = db.session.query(
+        Prediction.created_at, Prediction.model_type, Prediction.processing_time, Prediction.confidence_score
+    ).filter(Prediction.created_at.is_not(None)).execution_options(yield_per=chunk_rows)
+    totals = _aggregate(query)
+    total_predictions = db.session.query(func.count(Prediction.id)).scalar() or 0
+
+    batches = db.session.query(
+        func.count(BatchProcessing.id),
+        func.sum(BatchProcessing.total_rows),
+        func.sum(BatchProcessing.processing_time)
+    ).first()
+
+    values = _rollup_values(totals)
+    if values:
+        db.session.execute(PredictionRollup.__table__.insert(), values)
+    _add_to_system_stats(
+        total_predictions=total_predictions,
+        total_batch_jobs=batches[0] or 0,
+        total_batch_rows=batches[1] or 0,
+        batch_processing_time=batches[2] or 0.0
+    )
+    db.session.commit()
+    logging.info(f"Rebuilt {len(values)} prediction rollups from {total_predictions} predictions")
+    return len(values)
+
+
+def check_rollups():
+    """Warn at startup when the database has predictions or batches but no rollups yet
+
+    The backfill scans every prediction, so it is not run here: a worker or cold
+    start would redo it (and hold the rollup tables locked) until one finished.
+    Run `python -m utils.rollups` once when deploying onto an existing database.
+    Returns whether the rollups are in place.
+    """
+    has_predictions = Prediction.query.first() is not None
+    missing_rollups = PredictionRollup.query.first() is None and has_predictions
+    missing_totals = db.session.get(SystemStats, SYSTEM_STATS_ID) is None and (
+        has_predictions or BatchProcessing.query.first() is not None)
+    if missing_rollups or missing_totals:
+        logging.warning("Prediction rollups are missing for existing predictions or batches; "
+                        "dashboard totals are incomplete until `python -m utils.rollups` is run")
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        rebuild_rollups()